@@ -15,8 +15,8 @@ class Battery(LPObject):
         # Bat level in the time step - bat level in the last time step - Charging power * DeltaT * eta + Discharging power * DeltaT / eta = 0
         # First time step
         self.add_eq(var_lst=[[self.E,1,0],
-                             [self.p_charge,- self.inputdata.dt_h * self.eta_charge,0],
-                             [self.p_discharge,self.inputdata.dt_h * self.eta_discharge,0]],
+                             [self.p_charge,- self.inputdata.dt(0) * self.eta_charge,0],
+                             [self.p_discharge,self.inputdata.dt(0) * self.eta_discharge,0]],
                     sense='E',
                     b=0,
                     description='Bat. Energy Balance - first timestep')
@@ -24,8 +24,8 @@ class Battery(LPObject):
         for t in range(1,self.inputdata.steps):
             self.add_eq(var_lst=[[self.E,1,t],
                                  [self.E,-1,t-1],
-                                 [self.p_charge,- self.inputdata.dt_h * self.eta_charge,t],
-                                 [self.p_discharge,self.inputdata.dt_h * self.eta_discharge,t]],
+                                 [self.p_charge,- self.inputdata.dt(t) * self.eta_charge,t],
+                                 [self.p_discharge,self.inputdata.dt(t) * self.eta_discharge,t]],
                         sense='E',
                         b=0,
                         description='Bat. energy balance')
\ No newline at end of file
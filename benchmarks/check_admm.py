@@ -0,0 +1,51 @@
+'''
+Regression check of the distributed optimization (LPMain.optimize_admm) against the monolithic optimization.
+Districts of houses with batteries, that are only coupled by the balance of the shared grid connection (see systems.py), are optimized
+with HiGHS as one model and with ADMM (houses as subsystems, grid connection in the coordinator). The check fails (exit code 1) if ADMM
+does not converge or its objective deviates by more than --tolerance from the monolithic objective.
+
+Examples:
+    python benchmarks/check_admm.py
+    python benchmarks/check_admm.py --steps 144 --houses 3 10 --workers 4
+'''
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+from systems import District, make_district_inputdata
+from MilPython import Solver
+
+def run_case(steps,n_houses,args):
+    inputdata = make_district_inputdata(steps,n_houses)
+    district = District(inputdata,n_houses)
+    district.optimize(solver=Solver.HIGHS)
+    reference = float(district.f @ district.x)
+    district = District(inputdata,n_houses)
+    start = time.perf_counter()
+    district.optimize_admm(subsystems=district.houses,max_iter=args.max_iter,tol=args.tol,workers=args.workers,time_limit=args.time_limit)
+    admm_s = time.perf_counter() - start
+    objective = float(district.f @ district.x)
+    deviation = abs(objective - reference) / max(1.0,abs(reference))
+    info = district.solver_info
+    ok = info['status'] == 'converged' and deviation <= args.tolerance
+    print(f"steps={steps} houses={n_houses}: reference={reference:.2f} admm={objective:.2f} deviation={deviation:.2e} status={info['status']} "
+          f"iterations={info['iterations']} violation={info['coupling_violation']:.3g} time={admm_s:.2f}s {'ok' if ok else 'FAILED'}",flush=True)
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps',type=int,nargs='+',default=[12,48,144])
+    parser.add_argument('--houses',type=int,nargs='+',default=[3])
+    parser.add_argument('--max-iter',type=int,default=500)
+    parser.add_argument('--tol',type=float,default=1e-3)
+    parser.add_argument('--workers',type=int,default=1)
+    parser.add_argument('--time-limit',type=float,default=120)
+    parser.add_argument('--tolerance',type=float,default=5e-3,help='allowed relative deviation of the objective from the monolithic optimization')
+    args = parser.parse_args()
+    failed = [(steps,n_houses) for steps in args.steps for n_houses in args.houses if not run_case(steps,n_houses,args)]
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
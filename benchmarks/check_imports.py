@@ -0,0 +1,40 @@
+'''
+Check of the lazy imports: importing MilPython must not load the solver, GUI and plotting packages (gurobipy, cplex, highspy, sympy,
+tkinter, matplotlib) or scipy, they are only imported by the functions that need them. The import runs in a fresh interpreter; the check
+fails (exit code 1) if one of these modules is loaded or the import takes longer than --max-time seconds.
+
+Examples:
+    python benchmarks/check_imports.py
+    python benchmarks/check_imports.py --max-time 0.5
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('gurobipy','cplex','highspy','sympy','tkinter','matplotlib','scipy')
+
+CODE = '''
+import json,sys,time
+start = time.perf_counter()
+import MilPython
+duration = time.perf_counter() - start
+print(json.dumps({'time_s':duration,'modules':sorted({name.split('.')[0] for name in sys.modules})}))
+'''
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-time',type=float,default=1.0,help='maximum time of import MilPython in seconds')
+    args = parser.parse_args()
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'src')
+    env = dict(os.environ,PYTHONPATH=os.pathsep.join(filter(None,[src,os.environ.get('PYTHONPATH')])))
+    output = subprocess.run([sys.executable,'-c',CODE],env=env,capture_output=True,text=True,check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    loaded = [name for name in HEAVY_MODULES if name in result['modules']]
+    ok = not loaded and result['time_s'] <= args.max_time
+    print(f"import MilPython: {result['time_s']:.3f}s, heavy modules loaded: {', '.join(loaded) if loaded else 'none'} {'ok' if ok else 'FAILED'}")
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
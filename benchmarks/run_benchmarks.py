@@ -0,0 +1,143 @@
+'''
+Scaling benchmark for building and solving MilPython models.
+For every combination of time steps, number of batteries and MILP share a synthetic building (see systems.py) is set up and optimized.
+Measured are the time for setting up the model (LPMain.__init__), the time for assembling the equation system (def_eqs), the peak memory
+while setting up the model (tracemalloc, separate run) and the solve time per solver backend (transfer + solve and the runtime reported by the solver).
+Only SciPy and HiGHS are used by default, as they run without a licence.
+
+The results are written to a JSON file together with the versions of the packages. With --compare a former result file is read and
+runs that got slower by more than --tolerance are reported (exit code 1), so performance regressions between releases can be tracked.
+
+Examples:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --steps 100 1000 10000 100000 1000000 --batteries 1 --solvers highs --max-solve-steps 100000
+    python benchmarks/run_benchmarks.py --output new.json --compare baseline.json
+    python benchmarks/run_benchmarks.py --ordering variable --output variable.json --compare baseline.json
+'''
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+from systems import Building, make_inputdata
+from MilPython import Solver
+
+SOLVERS = {'scipy':Solver.SCIPY,'highs':Solver.HIGHS,'gurobi':Solver.GUROBI,'cplex':Solver.CPLEX}
+
+def build(steps,n_batteries,milp_share,style,ordering='time',**kwargs):
+    inputdata = make_inputdata(steps)
+    inputdata.ordering = ordering
+    start = time.perf_counter()
+    building = Building(inputdata,n_batteries,milp_share,style,**kwargs)
+    return building,time.perf_counter() - start
+
+def peak_memory_mb(steps,n_batteries,milp_share,style,ordering):
+    '''Peak memory of setting up the model, measured in a separate run as tracemalloc slows down the set up'''
+    gc.collect()
+    tracemalloc.start()
+    building,_ = build(steps,n_batteries,milp_share,style,ordering)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del building
+    return peak / 1e6
+
+def run_case(steps,n_batteries,milp_share,args):
+    building,t_build = build(steps,n_batteries,milp_share,args.style,args.ordering)
+    phases = building.profile_report()['phases']
+    row = {'steps':steps,'batteries':n_batteries,'milp_share':milp_share,'style':args.style,'ordering':args.ordering,
+           'rows':building.Aeq.shape[0],'cols':building.Aeq.shape[1],'nnz':int(building.Aeq.nnz),
+           'build_s':t_build,'def_equations_s':phases['def_eqs/def_equations']['time_s'],
+           'assembly_s':phases['def_eqs/return_triplets']['time_s'] + phases['def_eqs/assemble']['time_s']}
+    if args.memory:
+        row['build_peak_mb'] = peak_memory_mb(steps,n_batteries,milp_share,args.style,args.ordering)
+    for name in args.solvers:
+        if steps > args.max_solve_steps:
+            continue
+        building.profiler.reset()
+        try:
+            building.optimize(solver=SOLVERS[name],mipGap=args.mip_gap,time_limit=args.time_limit)
+        except Exception as e:
+            row[f'{name}_error'] = str(e)
+            continue
+        phases = building.profile_report()['phases']
+        row[f'{name}_solve_s'] = phases['optimize/solver']['time_s']
+        row[f'{name}_solver_runtime_s'] = building.solver_info.get('runtime_s')
+        row[f'{name}_nodes'] = building.solver_info.get('nodes')
+        row[f'{name}_objective'] = float(building.f @ building.x)
+    del building
+    gc.collect()
+    return row
+
+def environment()->dict:
+    versions = {}
+    for module in ('numpy','scipy','highspy','gurobipy','cplex'):
+        try:
+            versions[module] = getattr(__import__(module),'__version__','unknown')
+        except ImportError:
+            pass
+    return {'python':platform.python_version(),'platform':platform.platform(),'cpu_count':os.cpu_count(),'packages':versions}
+
+def compare(rows,baseline_path,tolerance):
+    '''Prints the runs that are slower than in the baseline file by more than tolerance and returns their number'''
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    key = lambda row: (row['steps'],row['batteries'],row['milp_share'],row['style'],row.get('ordering','time'))
+    baseline_rows = {key(row):row for row in baseline['results']}
+    regressions = 0
+    for row in rows:
+        old = baseline_rows.get(key(row))
+        if old is None:
+            continue
+        for metric,value in row.items():
+            if not metric.endswith('_s') or value is None or old.get(metric) is None:
+                continue
+            if value > old[metric] * (1 + tolerance) and value - old[metric] > 0.01:
+                print(f'REGRESSION {key(row)} {metric}: {old[metric]:.3f}s -> {value:.3f}s')
+                regressions += 1
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps',type=int,nargs='+',default=[100,1000,10000,100000])
+    parser.add_argument('--batteries',type=int,nargs='+',default=[1,4])
+    parser.add_argument('--milp-share',type=float,nargs='+',default=[0.0,0.5])
+    parser.add_argument('--style',choices=['block','loop'],default='block',help='equation blocks or one add_eq per time step')
+    parser.add_argument('--ordering',choices=['time','variable'],default='time',help='order of the time dependent variables (see LPInputdata)')
+    parser.add_argument('--solvers',nargs='*',choices=list(SOLVERS),default=['scipy','highs'])
+    parser.add_argument('--max-solve-steps',type=int,default=10000,help='larger models are only set up, not solved')
+    parser.add_argument('--time-limit',type=float,default=300)
+    parser.add_argument('--mip-gap',type=float,default=0.01)
+    parser.add_argument('--no-memory',dest='memory',action='store_false',help='skip the memory measurement')
+    parser.add_argument('--output',default='benchmark_results.json')
+    parser.add_argument('--compare',help='result file of a former run')
+    parser.add_argument('--tolerance',type=float,default=0.2,help='allowed slow down compared to --compare (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    # warm up: imports of scipy and the solver packages are not part of the measurements
+    building,_ = build(10,1,0.0,args.style,args.ordering)
+    for name in args.solvers:
+        try:
+            building.optimize(solver=SOLVERS[name])
+        except Exception:
+            pass
+    rows = []
+    for steps,n_batteries,milp_share in itertools.product(args.steps,args.batteries,args.milp_share):
+        row = run_case(steps,n_batteries,milp_share,args)
+        rows.append(row)
+        solve = ' '.join(f"{name}={row[f'{name}_solve_s']:.3f}s" for name in args.solvers if f'{name}_solve_s' in row)
+        memory = f" peak={row['build_peak_mb']:.1f}MB" if 'build_peak_mb' in row else ''
+        print(f"steps={steps} batteries={n_batteries} milp_share={milp_share}: nnz={row['nnz']} build={row['build_s']:.3f}s "
+              f"assembly={row['assembly_s']:.3f}s{memory} {solve}",flush=True)
+    with open(args.output,'w') as file:
+        json.dump({'environment':environment(),'arguments':vars(args),'results':rows},file,indent=1)
+    if args.compare:
+        sys.exit(1 if compare(rows,args.compare,args.tolerance) else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+'''
+Synthetic building energy systems for the benchmarks.
+A building with a grid connection, a constant electrical load with noise and n batteries. A share of the batteries (milp_share) gets a binary
+variable that prevents charging and discharging at the same time, so the share of integer variables can be scaled.
+The equations are either defined with equation blocks (style='block') or with one add_eq per time step (style='loop'), so both ways of
+setting up a model are covered.
+The district (houses with their own load and battery, coupled only by a shared grid connection) is the test case of the distributed optimization.
+'''
+import numpy as np
+from MilPython import *
+
+class Battery(LPObject):
+    '''Battery storage with charging and discharging efficiency; with binary=True charging and discharging at the same time is prevented by a binary variable'''
+    def __init__(self,inputdata:LPInputdata,binary=False,style='block',name='',comment=''):
+        super().__init__(inputdata,name,comment)
+        self.p_max = 3000
+        self.eta = 0.95
+        self.binary = binary
+        self.style = style
+        self.p_discharge = self.add_time_var('P_bat_discharge','W',ub=self.p_max)
+        self.p_charge = self.add_time_var('P_bat_charge','W',ub=self.p_max)
+        self.E = self.add_time_var('E_el','Wh',ub=6000)
+        if binary:
+            self.charge_switch = self.add_time_var('switch_charge_discharge',vtype='B')
+
+    def def_equations(self):
+        if self.style == 'block':
+            dt = self.inputdata.dt_h
+            self.add_eq_block([[self.E,1],[self.E,-1,-1],[self.p_charge,-dt*self.eta],[self.p_discharge,dt/self.eta]],
+                              boundary='fixed',description='Bat. energy balance')
+            if self.binary:
+                self.add_eq_block([[self.charge_switch,self.p_max],[self.p_charge,-1]],sense='>',b=0,description='Bat. charging')
+                self.add_eq_block([[self.charge_switch,self.p_max],[self.p_discharge,1]],sense='<',b=self.p_max,description='Bat. discharging')
+            return
+        dt = self.inputdata.dt(0)
+        self.add_eq([[self.E,1,0],[self.p_charge,-dt*self.eta,0],[self.p_discharge,dt/self.eta,0]],'E',0,'Bat. energy balance - first timestep')
+        for t in range(1,self.inputdata.steps):
+            dt = self.inputdata.dt(t)
+            self.add_eq([[self.E,1,t],[self.E,-1,t-1],[self.p_charge,-dt*self.eta,t],[self.p_discharge,dt/self.eta,t]],'E',0,'Bat. energy balance')
+        if self.binary:
+            for t in range(self.inputdata.steps):
+                self.add_eq([[self.charge_switch,self.p_max,t],[self.p_charge,-1,t]],'>',0,'Bat. charging')
+                self.add_eq([[self.charge_switch,self.p_max,t],[self.p_discharge,1,t]],'<',self.p_max,'Bat. discharging')
+
+class GridConnection(LPObject):
+    '''Grid connection without feed-in'''
+    def __init__(self,inputdata:LPInputdata,name='',comment=''):
+        super().__init__(inputdata,name,comment)
+        self.p_consumption = self.add_time_var('P_grid_taken','W',ub=np.inf)
+        self.p_feed = self.add_time_var('P_grid_feed','W',ub=0)
+
+class Building(LPObject,LPMain):
+    '''Building with grid connection and n_batteries batteries; n_batteries*milp_share (rounded half up) of them have a binary variable'''
+    def __init__(self,inputdata:LPInputdata,n_batteries=1,milp_share=0.0,style='block',**kwargs):
+        LPObject.__init__(self,inputdata,'Building','')
+        self.style = style
+        n_binary = int(n_batteries*milp_share + 0.5)
+        self.batteries = [Battery(inputdata,binary=i < n_binary,style=style,name=f'Battery_{i}') for i in range(n_batteries)]
+        self.grid = GridConnection(inputdata,name='Grid')
+        self.obj_lst = [self,self.grid,*self.batteries]
+        LPMain.__init__(self,inputdata,**kwargs)
+
+    def def_equations(self):
+        var_lst = [[self.grid.p_feed,-1],[self.grid.p_consumption,1]]
+        for bat in self.batteries:
+            var_lst += [[bat.p_charge,-1],[bat.p_discharge,1]]
+        demand = self.inputdata.data['electricity_demand']
+        if self.style == 'block':
+            self.add_eq_block(var_lst,'E',demand,description='electrical energy balance')
+            return
+        for t in range(self.inputdata.steps):
+            self.add_eq([var_info+[t] for var_info in var_lst],'E',demand[t],'electrical energy balance')
+
+    def def_targetfun(self):
+        self.add_var_targetfun(self.grid.p_consumption,self.inputdata.data['electricity_price'])
+
+class House(LPObject):
+    '''House of a district with its own load (electricity_demand[idx]) and battery; P_house is the power taken from the district grid'''
+    def __init__(self,inputdata:LPInputdata,idx:int,name='',comment=''):
+        super().__init__(inputdata,name,comment)
+        self.idx = idx
+        self.bat = Battery(inputdata,name=f'{name}_battery')
+        self.p_house = self.add_time_var('P_house','W',lb=-np.inf,ub=np.inf)
+
+    def def_equations(self):
+        demand = self.inputdata.data['electricity_demand'][self.idx]
+        self.add_eq_block([[self.p_house,1],[self.bat.p_charge,-1],[self.bat.p_discharge,1]],'E',demand,description='electrical energy balance')
+
+class District(LPObject,LPMain):
+    '''District of n_houses houses, that are only coupled by the balance of the shared grid connection (for distributed optimization with ADMM)'''
+    def __init__(self,inputdata:LPInputdata,n_houses=3,**kwargs):
+        LPObject.__init__(self,inputdata,'District','')
+        self.grid = GridConnection(inputdata,name='Grid')
+        self.houses = [House(inputdata,i,name=f'House_{i}') for i in range(n_houses)]
+        self.obj_lst = [self,self.grid] + [obj for house in self.houses for obj in (house,house.bat)]
+        LPMain.__init__(self,inputdata,**kwargs)
+
+    def def_equations(self):
+        var_lst = [[self.grid.p_consumption,1],[self.grid.p_feed,-1]] + [[house.p_house,-1] for house in self.houses]
+        self.add_eq_block(var_lst,'E',0,description='district grid balance')
+
+    def def_targetfun(self):
+        self.add_var_targetfun(self.grid.p_consumption,self.inputdata.data['electricity_price'])
+
+def make_district_inputdata(steps:int,n_houses:int,seed:int=0)->LPInputdata:
+    '''Input data of a district: the price profile of make_inputdata and one noisy load with its own daily peak per house'''
+    rng = np.random.default_rng(seed)
+    t = np.arange(steps)
+    price = 0.3 + 0.1*np.sin(2*np.pi*t/144) + 0.02*rng.standard_normal(steps)
+    demand = [500 + 400*np.sin(2*np.pi*t/144 + rng.uniform(0,2*np.pi)).clip(0) + 100*rng.random(steps) for _ in range(n_houses)]
+    return LPInputdata({'electricity_price':price,'electricity_demand':demand},dt_h=10/60,verbose=False)
+
+def make_inputdata(steps:int,seed:int=0)->LPInputdata:
+    '''Input data with a daily price profile (10 min steps) and a noisy constant load; the same seed gives the same data'''
+    rng = np.random.default_rng(seed)
+    t = np.arange(steps)
+    price = 0.3 + 0.1*np.sin(2*np.pi*t/144) + 0.02*rng.standard_normal(steps)
+    demand = 500 + 100*rng.standard_normal(steps).clip(-3,3)
+    return LPInputdata({'electricity_price':price,'electricity_demand':demand},dt_h=10/60,verbose=False)
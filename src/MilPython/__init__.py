@@ -4,5 +4,6 @@ from .lpStateVar import LPStateVar
 from .lpStateVar import LPStateVar_timedep
 from .lpStateVar import LPStateVar_add
 from .lpMain import LPMain
+from .lpResults import LPResults
 from .equation import Equation as Eq
 from .tools import plot_sum, Solver,Obj
\ No newline at end of file
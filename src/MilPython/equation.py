@@ -1,6 +1,11 @@
-from .lpStateVar import LPStateVar
+import numpy as np
+from array import array
+from collections.abc import MutableSequence
+from .lpStateVar import LPStateVar, LPStateVar_timedep
 class Equation:
     '''Simple class for new equations. The Format is alway: Sum(stateVar*factor) >sense< b'''
+    __slots__ = ('var_lst','sense','b','description')
+
     def __init__(self,var_lst:list,sense:str,b:float,description:str):
         """
         Args:
@@ -11,4 +16,266 @@ class Equation:
         self.var_lst = var_lst
         self.sense = sense
         self.b = b
-        self.description=description
\ No newline at end of file
+        self.description=description
+
+class EquationBlock:
+    '''
+    Equation that is defined for a range of time steps at once. The Format in every step t is: Sum(stateVar[t+offset]*factor[t]) >sense< b[t]
+    Instead of one Equation-object per time step, the coefficients are kept as arrays and the sparse matrix entries are created with numpy
+    '''
+    __slots__ = ('steps','var_lst','sense','b','description','boundary','initial','final','period_steps')
+
+    def __init__(self,var_lst:list,sense:str,b,steps,description:str,boundary:str='skip',initial:dict=None,final:dict=None,period_steps:int=None):
+        """
+        Args:
+            var_lst (list): each item represents one variable in the equation, format of each item: [stateVar,factor] or [stateVar,factor,offset]; factor may be a single value or an array with one value per step, offset is the time offset relative to the step t (e.g. -1 for t-1)
+            sense (str): ">","=" or "<"
+            b (float or array): right side of equation, single value or an array with one value per step
+            steps (array): time steps for which the equation is defined
+            boundary (str, optional): handling of offsets that point outside the time horizon. 'skip': no equation for these steps; 'cyclic': offsets wrap around (periodic); 'fixed': the variable is replaced by its value from initial/final and moved to the right side;
+                                      'periodic': offsets wrap around within each period of period_steps steps (typical periods, see LPInputdata.aggregate). Defaults to 'skip'.
+            initial (dict, optional): {stateVar:value} used for steps before the first step if boundary='fixed'. Missing variables take stateVar.initial (0 if not set).
+            final (dict, optional): {stateVar:value} used for steps after the last step if boundary='fixed'. Missing variables are 0.
+            period_steps (int, optional): number of steps of a period for boundary='periodic'
+        """
+        if boundary not in ('skip','cyclic','fixed','periodic'):
+            raise ValueError(f"Unknown boundary '{boundary}'. Use 'skip', 'cyclic', 'fixed' or 'periodic'")
+        if boundary == 'periodic' and not period_steps:
+            raise ValueError("boundary='periodic' needs the number of steps of a period (period_steps)")
+        self.steps = np.asarray(steps,dtype=int)
+        n = len(self.steps)
+        self.var_lst = [[var_info[0],np.broadcast_to(np.asarray(var_info[1],dtype=float),(n,)),var_info[2] if len(var_info) == 3 else 0] for var_info in var_lst]
+        self.sense = sense
+        self.b = np.broadcast_to(np.asarray(b,dtype=float),(n,))
+        self.description = description
+        self.boundary = boundary
+        self.initial = initial if initial is not None else {}
+        self.final = final if final is not None else {}
+        self.period_steps = period_steps
+    
+    def __len__(self):
+        return len(self.steps)
+    
+    def resolve(self,num_steps):
+        '''
+        Applies the boundary handling to the offsets of all variables.
+        Returns a mask of the kept steps, the time step of every variable in the kept steps (list of arrays) and the right side of the kept equations.
+        '''
+        keep = np.ones(len(self.steps),dtype=bool)
+        if self.boundary == 'skip':
+            for var,_,offset in self.var_lst:
+                if isinstance(var,LPStateVar_timedep):
+                    t = self.steps + offset
+                    keep &= (t >= 0) & (t < num_steps)
+        b = self.b[keep]
+        t_lst = []
+        for var,factor,offset in self.var_lst:
+            t = self.steps[keep] + offset
+            if isinstance(var,LPStateVar_timedep) and self.boundary == 'cyclic':
+                t = t % num_steps
+            elif isinstance(var,LPStateVar_timedep) and self.boundary == 'periodic':
+                period_start = self.steps[keep] // self.period_steps * self.period_steps
+                t = period_start + (t - period_start) % self.period_steps
+            elif isinstance(var,LPStateVar_timedep) and self.boundary == 'fixed':
+                before = t < 0
+                after = t >= num_steps
+                value_before = self.initial.get(var,var.initial if var.initial is not None else 0)
+                b = b - factor[keep] * (before * value_before + after * self.final.get(var,0))
+            t_lst.append(t)
+        return keep,t_lst,b
+    
+    def return_coo(self,stride,num_steps):
+        '''
+        Returns the row, col and data arrays of the block (rows are numbered starting at zero) and the right side of the equations
+        stride: distance of the columns of two consecutive time steps of a variable (see LPInputdata.ordering)
+        '''
+        keep,t_lst,b = self.resolve(num_steps)
+        rows = np.arange(len(b))
+        row_lst,col_lst,data_lst = [],[],[]
+        for (var,factor,_),t in zip(self.var_lst,t_lst):
+            if isinstance(var,LPStateVar_timedep):
+                inside = (t >= 0) & (t < num_steps)
+                col = var.pos + t[inside] * stride
+                row_lst.append(rows[inside])
+                data_lst.append(factor[keep][inside])
+            else:
+                col = np.full(len(b),var.pos)
+                row_lst.append(rows)
+                data_lst.append(factor[keep])
+            col_lst.append(col)
+        return np.concatenate(row_lst),np.concatenate(col_lst),np.concatenate(data_lst),b
+    
+    def equations(self,num_steps)->list[Equation]:
+        '''Returns the equations of the block as Equation-objects (e.g. for displaying the equation system)'''
+        keep,t_lst,b = self.resolve(num_steps)
+        eq_lst = []
+        for row,idx in enumerate(np.flatnonzero(keep)):
+            var_lst = []
+            for (var,factor,_),t in zip(self.var_lst,t_lst):
+                if not isinstance(var,LPStateVar_timedep):
+                    var_lst.append([var,float(factor[idx])])
+                elif 0 <= t[row] < num_steps:
+                    var_lst.append([var,float(factor[idx]),int(t[row])])
+            eq_lst.append(Equation(var_lst,self.sense,float(b[row]),self.description))
+        return eq_lst
+
+
+class EquationStore:
+    '''
+    Array-backed storage of the single equations of an LPObject (added with LPObject.add_eq).
+    Instead of one Equation-object with a list of [stateVar,factor,timestep]-lists per equation, the terms of all equations are appended to flat arrays
+    (index of the variable, factor, time step) and the equations are given by the start index of their terms. Equation-objects are only created
+    on demand, e.g. for displaying the equation system.
+    '''
+    __slots__ = ('var_lst','var_idx','var_ids','factors','timesteps','eq_start','senses','b','descriptions')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        '''Deletes all equations'''
+        self.var_lst = []               # distinct stateVars used in the equations
+        self.var_idx = {}               # stateVar -> index in var_lst
+        self.var_ids = array('q')       # per term: index of the stateVar in var_lst
+        self.factors = array('d')       # per term: factor
+        self.timesteps = array('q')     # per term: time step (0 for additional variables)
+        self.eq_start = array('q',[0])  # per equation: index of the first term (plus end index of the last equation)
+        self.senses = []
+        self.b = array('d')
+        self.descriptions = []
+
+    def __len__(self):
+        return len(self.b)
+
+    def add(self,var_lst:list,sense:str,b:float,description:str=''):
+        """
+        Args:
+            var_lst (list): each items of the list represents one variable in equation, format of each item (time dependent): [stateVar,factor,timestep]; for additional variables: [stateVar,factor]
+            sense (str): ">","=" or "<"
+            b (float): right side of equation
+            description (str): optional short description of equation
+        """
+        # convert all terms first, so an invalid term does not leave a partly added equation
+        var_ids = array('q')
+        try:
+            factors = array('d',[var_info[1] for var_info in var_lst])
+        except TypeError:
+            term = next((var_info for var_info in var_lst if not self.__is_number(var_info[1])),None)
+            if term is None:
+                raise
+            name = getattr(term[0],'name',term[0])
+            if np.ndim(term[1]) > 0:
+                raise ValueError(f"The factor of '{name}' in equation '{description}' has to be a single value, got shape {np.shape(term[1])}. "
+                                 'With per-step dt_h use the stepsize of the time step, inputdata.dt(t), or add_eq_block') from None
+            raise TypeError(f"The factor of '{name}' in equation '{description}' has to be a number, got {term[1]!r}") from None
+        timesteps = array('q',[var_info[2] if len(var_info) == 3 else 0 for var_info in var_lst])
+        b = float(b)
+        new_vars = {}
+        for var_info in var_lst:
+            var = var_info[0]
+            idx = self.var_idx.get(var)
+            if idx is None:
+                idx = new_vars.setdefault(var,len(self.var_lst) + len(new_vars))
+            var_ids.append(idx)
+        for var in new_vars:
+            self.var_idx[var] = len(self.var_lst)
+            self.var_lst.append(var)
+        self.var_ids.extend(var_ids)
+        self.factors.extend(factors)
+        self.timesteps.extend(timesteps)
+        self.eq_start.append(len(self.var_ids))
+        self.senses.append(sense)
+        self.b.append(b)
+        self.descriptions.append(description)
+
+    @staticmethod
+    def __is_number(value):
+        try:
+            float(value)
+            return np.ndim(value) == 0
+        except (TypeError,ValueError):
+            return False
+
+    def return_coo(self,stride):
+        '''
+        Returns the row, col and data arrays of the stored equations (rows are numbered starting at zero) and the right side of the equations
+        stride: distance of the columns of two consecutive time steps of a variable (see LPInputdata.ordering)
+        '''
+        pos = np.array([var.pos for var in self.var_lst],dtype=int)
+        var_ids = np.frombuffer(self.var_ids,dtype=np.int64)
+        timesteps = np.frombuffer(self.timesteps,dtype=np.int64)
+        rows = np.repeat(np.arange(len(self)),np.diff(np.frombuffer(self.eq_start,dtype=np.int64)))
+        cols = pos[var_ids] + timesteps * stride
+        return rows,cols,np.array(self.factors),np.array(self.b)
+
+    def equation(self,idx:int)->Equation:
+        '''Returns equation number idx as Equation-object'''
+        var_lst = []
+        for term in range(self.eq_start[idx],self.eq_start[idx+1]):
+            var = self.var_lst[self.var_ids[term]]
+            if isinstance(var,LPStateVar_timedep):
+                var_lst.append([var,self.factors[term],self.timesteps[term]])
+            else:
+                var_lst.append([var,self.factors[term]])
+        return Equation(var_lst,self.senses[idx],self.b[idx],self.descriptions[idx])
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self.equation(idx)
+
+
+class EquationList(MutableSequence):
+    '''
+    List view of the equations in an EquationStore (LPObject.eq_lst), so eq_lst can still be used like the former list of Equation-objects.
+    Reading creates Equation-objects on demand, append and extend add to the store; other changes (insert, replace, delete) rebuild the store
+    '''
+    __slots__ = ('store',)
+
+    def __init__(self,store:EquationStore):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self,idx):
+        if isinstance(idx,slice):
+            return [self.store.equation(i) for i in range(len(self.store))[idx]]
+        return self.store.equation(range(len(self.store))[idx])
+
+    def __iter__(self):
+        return iter(self.store)
+
+    def append(self,eq:Equation):
+        self.store.add(eq.var_lst,eq.sense,eq.b,eq.description)
+
+    def extend(self,eqs):
+        for eq in list(eqs):
+            self.append(eq)
+
+    def __setitem__(self,idx,value):
+        eqs = list(self.store)
+        eqs[idx] = value
+        self.__rebuild(eqs)
+
+    def __delitem__(self,idx):
+        eqs = list(self.store)
+        del eqs[idx]
+        self.__rebuild(eqs)
+
+    def insert(self,idx,eq:Equation):
+        eqs = list(self.store)
+        eqs.insert(idx,eq)
+        self.__rebuild(eqs)
+
+    def clear(self):
+        self.store.clear()
+
+    def __rebuild(self,eqs):
+        self.store.clear()
+        self.extend(eqs)
+
+    def __eq__(self,other):
+        return list(self) == list(other) if isinstance(other,(list,EquationList)) else NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
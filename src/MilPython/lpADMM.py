@@ -0,0 +1,391 @@
+import time
+import numpy as np
+from .lpObject import LPObject
+from .lpStateVar import LPStateVar_timedep
+from .tools import Obj
+
+class LPADMM:
+    '''
+    Distributed optimization of an LPMain object with ADMM (sharing form).
+    Every subsystem (an LPObject together with all LPObjects it references, e.g. a building with its battery and PV) becomes a subproblem;
+    main and all objects that are not part of a subsystem form the coordinator. By default every top-level object is a subsystem, also objects
+    that are only referenced by main such as a shared grid connection; pass subsystems (e.g. district.houses) to keep these in the coordinator,
+    which balances the coupling equations in the primal recovery. Equations with variables of only one of these groups
+    stay local, equations with variables of several groups are coupling equations (inequalities get a slack variable in the coordinator).
+    In every iteration each group solves its local problem plus a quadratic penalty for the deviation of its share of the coupling equations from
+    its target and a small proximal term for the change of its variables, which keeps the QP strictly convex (HiGHS QP, in parallel processes
+    if workers > 1), then the targets and the scaled prices of the coupling equations are updated.
+    Integer and semi-continuous variables are relaxed during the iterations. The primal recovery solves the subsystems with integer variables
+    as MILP that follows the share of the coupling equations from the iterations as closely as possible and afterwards the coordinator with the
+    shares of all subsystems fixed, so the coupling equations are met exactly if the coordinator can balance the remaining deviations.
+    '''
+    def __init__(self,main,subsystems:list=None,objective:Obj=Obj.MINIMIZE):
+        """
+        Args:
+            main (LPMain): model with assembled equation system
+            subsystems (list, optional): LPObjects whose subtrees become subproblems. Defaults to all top-level objects in main.obj_lst
+                                         (objects that are not referenced by another object of obj_lst).
+            objective (Obj, optional): direction of the optimization. Defaults to Obj.MINIMIZE.
+        """
+        from scipy.sparse import csr_matrix,hstack
+        self.sign = 1 if objective == Obj.MINIMIZE else -1
+        subsystems = subsystems if subsystems is not None else self.top_level_objects(main)
+        integrality,lb,ub = main.integrality()
+        A = csr_matrix(main.Aeq)
+        A.sum_duplicates()
+        A.eliminate_zeros()
+        num_rows,num_vars = A.shape
+        self.num_vars = num_vars
+        # group of every variable: 0 = coordinator, 1... = subsystems
+        col_group = np.zeros(num_vars,dtype=int)
+        owner = {}
+        for group,obj in enumerate(subsystems,start=1):
+            for member in self.subtree(main,obj):
+                if id(member) in owner:
+                    raise ValueError(f"The LPObject '{member.name or type(member).__name__}' belongs to more than one subsystem")
+                owner[id(member)] = group
+                for var in member.getStateVars():
+                    col_group[self.__cols(main,var)] = group
+        # group of every equation: equations with variables of several groups are coupling equations
+        coo = A.tocoo()
+        num_groups = len(subsystems) + 1
+        row_min = np.zeros(num_rows,dtype=int)
+        row_max = np.zeros(num_rows,dtype=int)
+        if coo.nnz > 0:
+            row_min[:] = num_groups
+            np.minimum.at(row_min,coo.row,col_group[coo.col])
+            np.maximum.at(row_max,coo.row,col_group[coo.col])
+            row_min[row_min == num_groups] = 0
+        coupling = np.flatnonzero(row_min != row_max)
+        b_l,b_u = main.row_bounds()
+        senses = np.asarray(main.senses).astype('<U1')
+        senses[np.isin(senses,['E','e'])] = '='
+        self.b = np.asarray(main.beq,dtype=float)[coupling]
+        A_c = A[coupling]
+        # slack variables of the coupling inequalities: sum A_g x_g + s = b with s >= 0 ('<') or s <= 0 ('>')
+        slack_rows = np.flatnonzero(senses[coupling] != '=') if len(coupling) > 0 else np.zeros(0,dtype=int)
+        slack_sign = np.where(senses[coupling][slack_rows] == '<',1.0,-1.0)
+        S = csr_matrix((slack_sign,(slack_rows,np.arange(len(slack_rows)))),shape=(len(coupling),len(slack_rows)))
+        c = self.sign*np.asarray(main.f,dtype=float)
+        relax_lb = np.where(integrality >= 2,np.minimum(lb,0),lb)
+        self.subproblems = []
+        self.group_cols = []
+        for group in range(num_groups):
+            cols = np.flatnonzero(col_group == group)
+            local = np.flatnonzero((row_min == group) & (row_max == group))
+            C = A_c[:,cols]
+            if group == 0:
+                C = hstack([C,S]).tocsr()
+                c_g = np.r_[c[cols],np.zeros(len(slack_rows))]
+                lb_g,ub_g = np.r_[relax_lb[cols],np.zeros(len(slack_rows))],np.r_[ub[cols],np.full(len(slack_rows),np.inf)]
+                lb_int,integrality_g = np.r_[lb[cols],np.zeros(len(slack_rows))],np.r_[integrality[cols],np.zeros(len(slack_rows),dtype=int)]
+                A_loc = hstack([A[local][:,cols],csr_matrix((len(local),len(slack_rows)))]).tocsr()
+            else:
+                c_g,lb_g,ub_g,lb_int,integrality_g = c[cols],relax_lb[cols],ub[cols],lb[cols],integrality[cols]
+                A_loc = A[local][:,cols]
+            rows = np.flatnonzero(np.diff(C.indptr) > 0)
+            if len(c_g) == 0:
+                continue
+            self.group_cols.append(cols)
+            self.subproblems.append(_ADMMSubproblem(group,A_loc,b_l[local],b_u[local],C[rows],rows,c_g,lb_g,ub_g,lb_int,integrality_g))
+        self.num_slacks = len(slack_rows)
+        self.num_coupling = len(coupling)
+        self.report = {'subsystems':len(subsystems),'coupling_rows':len(coupling),'slacks':len(slack_rows)}
+
+    @staticmethod
+    def children(obj)->list:
+        '''LPObjects that are referenced by the attributes of obj (directly or in lists, tuples and dicts)'''
+        children = []
+        for value in vars(obj).values():
+            values = value.values() if isinstance(value,dict) else value if isinstance(value,(list,tuple)) else [value]
+            children.extend(item for item in values if isinstance(item,LPObject) and item is not obj)
+        return children
+
+    @classmethod
+    def top_level_objects(cls,main)->list:
+        '''Objects of main.obj_lst (except main itself) that are not referenced by another object of obj_lst (references of main do not count)'''
+        candidates = [obj for obj in main.obj_lst if obj is not main]
+        referenced = {id(child) for obj in candidates for child in cls.children(obj)}
+        return [obj for obj in candidates if id(obj) not in referenced]
+
+    @classmethod
+    def subtree(cls,main,obj)->list:
+        '''obj and all objects of main.obj_lst that can be reached from it by references'''
+        in_model = {id(item) for item in main.obj_lst if item is not main}
+        tree,stack,seen = [],[obj],{id(obj)}
+        while stack:
+            item = stack.pop()
+            tree.append(item)
+            for child in cls.children(item):
+                if id(child) in in_model and id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+        return tree
+
+    def __cols(self,main,var):
+        '''Columns of a variable in the result vector'''
+        if isinstance(var,LPStateVar_timedep):
+            return var.pos + np.arange(main.inputdata.steps)*main.inputdata.stride
+        return var.pos
+
+    def solve(self,rho:float=1.0,max_iter:int=200,tol:float=1e-3,workers:int=1,adaptive_rho=True,time_limit:float=None,verbose=True,profiler=None,
+              proximal:float=1e-2)->np.ndarray:
+        '''
+        Runs the ADMM iterations until primal and dual residual and the violation of every coupling equation are below tol (relative),
+        followed by the primal recovery. The remaining time of time_limit is passed to every subproblem, if it is reached the iterations stop
+        with the last complete iterate. proximal is the weight of the proximal term relative to rho.
+        Returns the full result vector; the progress is stored in self.log, the final state in self.status and self.report
+        '''
+        from contextlib import nullcontext
+        phase = profiler.phase if profiler is not None else lambda name: nullcontext({})
+        start = time.perf_counter()
+        m = self.num_coupling
+        subs = self.subproblems
+        z = [np.zeros(len(sub.rows)) for sub in subs]
+        x = [np.clip(0.0,sub.lb,sub.ub) for sub in subs]
+        u = [np.zeros(len(sub.rows)) for sub in subs]
+        participants = np.zeros(m)
+        for sub in subs:
+            participants[sub.rows] += 1
+        participants = np.maximum(participants,1)
+        # scales of the relative primal residual and violation: the right sides, at least the shares (right sides are often zero, e.g. balances)
+        b_norm = max(1.0,np.linalg.norm(self.b))
+        b_max = max(1.0,float(np.abs(self.b).max())) if m > 0 else 1.0
+        self.log = []
+        self.status = 'iteration limit'
+        executor = None
+        if workers > 1 and len(subs) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=min(workers,len(subs)),initializer=_init_worker,initargs=(subs,))
+        try:
+            for iteration in range(max_iter):
+                remaining = time_limit - (time.perf_counter() - start) if time_limit is not None else None
+                if remaining is not None and remaining <= 0:
+                    self.status = 'time limit'
+                    break
+                with phase('subproblems'):
+                    targets = [z_g - u_g for z_g,u_g in zip(z,u)]
+                    args = (range(len(subs)),targets,x,[rho]*len(subs),[proximal*rho]*len(subs),[remaining]*len(subs))
+                    if executor is not None:
+                        x_new = list(executor.map(_solve_worker,*args))
+                    else:
+                        x_new = [sub.solve(*args_g) for sub,*args_g in zip(subs,*args[1:])]
+                if any(x_g is None for x_g in x_new):
+                    # a subproblem reached the time limit, the last complete iterate is kept
+                    self.status = 'time limit'
+                    break
+                x = x_new
+                share = [sub.C @ x_g for sub,x_g in zip(subs,x)]
+                # targets: shares plus scaled prices, corrected by the mean violation of every coupling equation
+                total = np.zeros(m)
+                for sub,share_g,u_g in zip(subs,share,u):
+                    total[sub.rows] += share_g + u_g
+                correction = (total - self.b) / participants
+                z_old = z
+                z = [share_g + u_g - correction[sub.rows] for sub,share_g,u_g in zip(subs,share,u)]
+                u = [u_g + share_g - z_g for u_g,share_g,z_g in zip(u,share,z)]
+                residual = -self.b.copy()
+                for sub,share_g in zip(subs,share):
+                    residual[sub.rows] += share_g
+                violation = float(np.abs(residual).max()) if m > 0 else 0.0
+                # primal residual: deviation of the shares from their targets, but at least the actual violation of the coupling equations
+                consensus = np.sqrt(sum(np.sum((share_g - z_g)**2) for share_g,z_g in zip(share,z)))
+                primal = max(consensus,float(np.linalg.norm(residual)))
+                dual = rho*np.sqrt(sum(np.sum((z_g - z_old_g)**2) for z_g,z_old_g in zip(z,z_old)))
+                objective = sum(float(sub.c @ x_g) for sub,x_g in zip(subs,x))
+                u_norm = max(1.0,rho*np.sqrt(sum(np.sum(u_g**2) for u_g in u)))
+                b_norm = max(b_norm,np.sqrt(sum(np.sum(share_g**2) for share_g in share)))
+                b_max = max([b_max]+[float(np.abs(share_g).max()) for share_g in share if len(share_g) > 0])
+                self.log.append({'iteration':iteration,'objective':self.sign*objective,'primal_residual':float(primal),'dual_residual':float(dual),
+                                 'coupling_violation':violation,'rho':rho,'time_s':time.perf_counter() - start})
+                if verbose:
+                    print(f'ADMM iteration {iteration}: objective {self.sign*objective:.6g}, primal residual {primal:.3g}, dual residual {dual:.3g}, rho {rho:.3g}')
+                if primal <= tol*b_norm and dual <= tol*u_norm and violation <= tol*b_max:
+                    self.status = 'converged'
+                    break
+                # residual balancing on the residuals relative to their tolerances
+                if adaptive_rho and primal / b_norm > 10*dual / u_norm:
+                    rho *= 2
+                    u = [u_g / 2 for u_g in u]
+                elif adaptive_rho and dual / u_norm > 10*primal / b_norm:
+                    rho /= 2
+                    u = [u_g * 2 for u_g in u]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        with phase('recover'):
+            x = self.__recover(x,z)
+        if self.status == 'converged' and self.report['coupling_violation'] > tol*b_max:
+            self.status = 'coupling violated after recovery'
+        last = self.log[-1] if self.log else {}
+        self.report.update(iterations=len(self.log),status=self.status,primal_residual=last.get('primal_residual'),
+                           dual_residual=last.get('dual_residual'),rho=rho,time_s=time.perf_counter() - start)
+        return x
+
+    def __recover(self,x,z):
+        '''
+        Primal recovery: subsystems with integer variables are solved as MILP, afterwards the coordinator is solved with the shares of all
+        subsystems fixed. Returns the full result vector; the remaining violation of the coupling equations is stored in self.report
+        '''
+        subs = self.subproblems
+        x = list(x)
+        for idx,sub in enumerate(subs):
+            if sub.group > 0 and sub.integrality.any():
+                x[idx] = sub.recover(z[idx])
+        fixed = np.zeros(self.num_coupling)
+        for sub,x_g in zip(subs,x):
+            if sub.group > 0:
+                fixed[sub.rows] += sub.C @ x_g
+        coordinator = next((idx for idx,sub in enumerate(subs) if sub.group == 0),None)
+        if coordinator is not None:
+            sub = subs[coordinator]
+            x[coordinator] = sub.balance(self.b[sub.rows] - fixed[sub.rows])
+            fixed[sub.rows] += sub.C @ x[coordinator]
+        self.report['coupling_violation'] = float(np.abs(fixed - self.b).max()) if self.num_coupling > 0 else 0.0
+        result = np.zeros(self.num_vars)
+        for sub,cols,x_g in zip(subs,self.group_cols,x):
+            result[cols] = x_g[:len(cols)]
+        return result
+
+
+class _ADMMSubproblem:
+    '''
+    Subproblem of one group: min c x + rho/2*||C x - target||^2 + prox/2*||x - x_prev||^2  s.t.  b_l <= A x <= b_u,  lb <= x <= ub
+    rho*C^T C alone is only positive semidefinite (zero for all columns outside the coupling equations), the proximal term makes the Hessian
+    positive definite. The HiGHS model is created on the first solve in the process and kept, later iterations only change the costs
+    (and the Hessian if rho changes)
+    '''
+    def __init__(self,group,A,b_l,b_u,C,rows,c,lb,ub,lb_int,integrality):
+        self.group = group
+        self.A,self.b_l,self.b_u = A,b_l,b_u
+        self.C = C.tocsr()
+        self.rows = rows
+        self.c = c
+        self.lb,self.ub = lb,ub
+        self.lb_int = lb_int
+        self.integrality = integrality
+        self.__highs = None
+        self.__rho = None
+        self.__prox = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_ADMMSubproblem__highs'] = None
+        state['_ADMMSubproblem__rho'] = None
+        state['_ADMMSubproblem__prox'] = None
+        return state
+
+    def __model(self):
+        import highspy
+        problem = highspy.Highs()
+        problem.setOptionValue('output_flag',False)
+        problem.setOptionValue('threads',1)
+        A = self.A.tocsr()
+        lp = highspy.HighsLp()
+        lp.num_col_ = len(self.c)
+        lp.num_row_ = A.shape[0]
+        lp.col_cost_ = self.c
+        lp.col_lower_ = self.lb
+        lp.col_upper_ = self.ub
+        lp.row_lower_ = self.b_l
+        lp.row_upper_ = self.b_u
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.start_ = A.indptr
+        lp.a_matrix_.index_ = A.indices
+        lp.a_matrix_.value_ = A.data
+        problem.passModel(lp)
+        return problem
+
+    def __hessian(self,rho,prox):
+        import highspy
+        from scipy.sparse import tril,identity
+        Q = tril(rho*(self.C.T @ self.C) + prox*identity(len(self.c))).tocsc()
+        Q.sort_indices()
+        hessian = highspy.HighsHessian()
+        hessian.dim_ = len(self.c)
+        hessian.format_ = highspy.HessianFormat.kTriangular
+        hessian.start_ = Q.indptr
+        hessian.index_ = Q.indices
+        hessian.value_ = Q.data
+        self.__highs.passHessian(hessian)
+        self.__rho,self.__prox = rho,prox
+
+    def solve(self,target,x_prev,rho,prox,time_limit=None):
+        '''
+        Solves the relaxed subproblem for the target of its share of the coupling equations, x_prev is the center of the proximal term.
+        Returns None if the time limit (seconds) is reached
+        '''
+        import highspy
+        if self.__highs is None:
+            self.__highs = self.__model()
+        if len(self.rows) > 0 and (rho,prox) != (self.__rho,self.__prox):
+            self.__hessian(rho,prox)
+        cost = self.c - rho*(self.C.T @ target)
+        if len(self.rows) > 0:
+            cost = cost - prox*np.where(np.isfinite(x_prev),x_prev,0.0)
+        self.__highs.changeColsCost(len(cost),np.arange(len(cost),dtype=np.int32),cost)
+        self.__highs.setOptionValue('time_limit',float(time_limit) if time_limit is not None else np.inf)
+        self.__highs.run()
+        if self.__highs.getModelStatus() == highspy.HighsModelStatus.kTimeLimit:
+            return None
+        if self.__highs.getInfo().primal_solution_status != 2:
+            raise Exception(f'ADMM: subproblem {self.group} could not be solved ({self.__highs.modelStatusToString(self.__highs.getModelStatus())})')
+        return np.array(self.__highs.getSolution().col_value)
+
+    def __milp(self,c,A_extra=None,b_l_extra=None,b_u_extra=None,num_extra=0):
+        '''Solves the subproblem with its integer variables; extra equations and num_extra additional variables (>= 0, cost in c) can be added'''
+        from scipy.optimize import LinearConstraint,Bounds,milp
+        from scipy.sparse import csr_matrix,hstack,vstack
+        A = hstack([self.A,csr_matrix((self.A.shape[0],num_extra))]).tocsr()
+        b_l,b_u = self.b_l,self.b_u
+        if A_extra is not None:
+            A = vstack([A,A_extra]).tocsr()
+            b_l,b_u = np.r_[b_l,b_l_extra],np.r_[b_u,b_u_extra]
+        bounds = Bounds(np.r_[self.lb_int,np.zeros(num_extra)],np.r_[self.ub,np.full(num_extra,np.inf)])
+        integrality = np.r_[self.integrality,np.zeros(num_extra,dtype=int)]
+        res = milp(c=c,constraints=[LinearConstraint(A,b_l,b_u)] if A.shape[0] > 0 else [],integrality=integrality,bounds=bounds)
+        return res
+
+    def recover(self,target):
+        '''
+        Solves the subproblem as MILP and minimizes the deviation of its share of the coupling equations from target (L1 norm); the weight of
+        the deviation is large compared to the costs, so the subsystem follows its target as far as its integer variables allow
+        '''
+        from scipy.sparse import hstack,vstack,identity
+        n,m = len(self.c),len(self.rows)
+        # deviation d >= |C x - target|: C x - d <= target, C x + d >= target
+        A_extra = vstack([hstack([self.C,-identity(m)]),hstack([self.C,identity(m)])]).tocsr()
+        weight = 10*max(1.0,np.abs(self.c).max(initial=0))
+        c = np.r_[self.c,np.full(m,weight)]
+        res = self.__milp(c,A_extra,np.r_[np.full(m,-np.inf),target],np.r_[target,np.full(m,np.inf)],m)
+        if res.x is None:
+            raise Exception(f'ADMM: primal recovery of subproblem {self.group} failed ({res.message})')
+        return res.x[:n]
+
+    def balance(self,rhs):
+        '''
+        Solves the coordinator with its integer variables so that its share of the coupling equations equals rhs.
+        If that is infeasible, the deviation from rhs is minimized instead
+        '''
+        from scipy.sparse import hstack,identity
+        n,m = len(self.c),len(self.rows)
+        res = self.__milp(self.c,self.C,rhs,rhs)
+        if res.x is not None:
+            return res.x[:n]
+        # elastic: C x + e_plus - e_minus = rhs, minimize e_plus + e_minus
+        A_extra = hstack([self.C,identity(m),-identity(m)]).tocsr()
+        res = self.__milp(np.r_[np.zeros(n),np.ones(2*m)],A_extra,rhs,rhs,2*m)
+        if res.x is None:
+            raise Exception(f'ADMM: primal recovery of the coordinator failed ({res.message})')
+        return res.x[:n]
+
+
+_worker_subproblems = None
+
+def _init_worker(subproblems):
+    '''Sends the subproblems once to every worker process'''
+    global _worker_subproblems
+    _worker_subproblems = subproblems
+
+def _solve_worker(idx,target,x_prev,rho,prox,time_limit):
+    return _worker_subproblems[idx].solve(target,x_prev,rho,prox,time_limit)
@@ -0,0 +1,266 @@
+import time
+import numpy as np
+from .tools import Obj
+
+class LPBenders:
+    '''
+    Benders decomposition of the equation system of an LPMain object into a master problem and time block subproblems.
+    The master problem contains the additional variables (investment decisions, placed after the time dependent block) and one variable theta per block,
+    that estimates the costs of the block. The time dependent variables are split into blocks of block_steps steps. An equation that couples time steps
+    of different blocks (e.g. a storage balance at the block boundary) belongs to the block with most of its entries, the variables of the other blocks
+    in it are moved to the master problem as linking variables.
+    Every iteration solves the master problem (MILP) and then the subproblems (LP) for the master decisions, in parallel if workers > 1. A feasible
+    subproblem returns an optimality cut from the marginals of its equations, an infeasible one a feasibility cut from an elastic version of it.
+    Integer time dependent variables are relaxed in the subproblems; in the final solution they are solved as MILP with the master decisions fixed.
+    '''
+    def __init__(self,main,block_steps:int,objective:Obj=Obj.MINIMIZE,theta_lb:float=None):
+        """
+        Args:
+            main (LPMain): model with assembled equation system
+            block_steps (int): number of time steps per subproblem (e.g. the steps of a month)
+            objective (Obj, optional): direction of the optimization. Defaults to Obj.MINIMIZE.
+            theta_lb (float, optional): lower bound of the costs of every block. Defaults to a bound computed from the relaxation of every block.
+        """
+        from scipy.sparse import csr_matrix
+        if block_steps < 1:
+            raise ValueError('block_steps has to be at least 1')
+        self.sign = 1 if objective == Obj.MINIMIZE else -1
+        integrality,lb,ub = main.integrality()
+        A = csr_matrix(main.Aeq)
+        A.sum_duplicates()
+        A.eliminate_zeros()
+        num_rows,num_vars = A.shape
+        num_timedep = main.inputdata.num_vars_timedep*main.inputdata.steps
+        c = self.sign*np.asarray(main.f,dtype=float)
+        b = np.asarray(main.beq,dtype=float)
+        senses = np.asarray(main.senses).astype('<U1')
+        senses[np.isin(senses,['E','e'])] = '='
+        # block of every column, additional variables are master variables (-1)
+        col_block = np.full(num_vars,-1)
+        col_block[:num_timedep] = np.arange(num_timedep) // main.inputdata.stride % main.inputdata.steps // block_steps
+        num_blocks = int(col_block.max()) + 1 if num_timedep > 0 else 0
+        # block of every equation: the block with most entries of the equation, equations without time dependent variables belong to the master
+        coo = A.tocoo()
+        entry_block = col_block[coo.col]
+        sub_entry = entry_block >= 0
+        width = max(num_blocks,1)
+        pairs,counts = np.unique(coo.row[sub_entry].astype(np.int64)*width + entry_block[sub_entry],return_counts=True)
+        pair_row,pair_block = np.divmod(pairs,width)
+        # per row the block with most entries (the first one on ties)
+        order = np.lexsort((pair_block,-counts,pair_row))
+        first = np.diff(pair_row[order],prepend=-1) != 0
+        row_block = np.full(num_rows,-1)
+        row_block[pair_row[order][first]] = pair_block[order][first]
+        # variables of other blocks in an equation become linking variables of the master problem
+        linking = sub_entry & (entry_block != row_block[coo.row])
+        col_block[np.unique(coo.col[linking])] = -1
+        has_sub = np.bincount(coo.row[col_block[coo.col] >= 0],minlength=num_rows) > 0
+        row_block[~has_sub] = -1
+        self.master_cols = np.flatnonzero(col_block == -1)
+        self.col_block = col_block
+        self.num_vars = num_vars
+        self.report = {'blocks':num_blocks,'master_vars':len(self.master_cols),'linking_vars':int(len(self.master_cols) - (num_vars - num_timedep)),
+                       'master_rows':int((row_block == -1).sum())}
+        # master problem
+        master_rows = np.flatnonzero(row_block == -1)
+        self.c_master = c[self.master_cols]
+        self.A_master = A[master_rows][:,self.master_cols]
+        self.b_master = b[master_rows]
+        self.senses_master = senses[master_rows]
+        self.lb_master,self.ub_master = lb[self.master_cols],ub[self.master_cols]
+        self.integrality_master = integrality[self.master_cols]
+        # subproblems
+        self.blocks = []
+        for k in range(num_blocks):
+            cols = np.flatnonzero(col_block == k)
+            rows = np.flatnonzero(row_block == k)
+            if len(cols) == 0:
+                continue
+            A_rows = A[rows]
+            self.blocks.append(_BendersBlock(k,cols,A_rows[:,cols],A_rows[:,self.master_cols],b[rows],senses[rows],c[cols],lb[cols],ub[cols],integrality[cols]))
+        self.theta_lb = np.array([theta_lb if theta_lb is not None else block.lower_bound(self.lb_master,self.ub_master) for block in self.blocks],dtype=float)
+
+    def solve(self,max_iter:int=50,tol:float=1e-4,workers:int=1,mipGap:float=0.0,time_limit:float=None,verbose=True,profiler=None)->np.ndarray:
+        '''
+        Alternates between master problem and subproblems until the relative gap between lower and upper bound is below tol.
+        Returns the full result vector; the progress is stored in self.log, the final state in self.status and self.report
+        '''
+        from contextlib import nullcontext
+        phase = profiler.phase if profiler is not None else lambda name: nullcontext({})
+        start = time.perf_counter()
+        self.log = []
+        cuts_A,cuts_theta,cuts_b = [],[],[]
+        best = (np.inf,None,None)
+        self.status = 'iteration limit'
+        executor = None
+        if workers > 1 and len(self.blocks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=min(workers,len(self.blocks)),initializer=_init_worker,initargs=(self.blocks,))
+        try:
+            for iteration in range(max_iter):
+                with phase('master'):
+                    x_m,theta,lower = self.__solve_master(cuts_A,cuts_theta,cuts_b,mipGap)
+                with phase('subproblems'):
+                    if executor is not None:
+                        solutions = list(executor.map(_solve_block_worker,range(len(self.blocks)),[x_m]*len(self.blocks)))
+                    else:
+                        solutions = [block.solve(x_m) for block in self.blocks]
+                upper = self.c_master @ x_m
+                num_opt = num_feas = 0
+                for idx,(feasible,value,grad,x_k) in enumerate(solutions):
+                    # cut: value + grad*(x_m' - x_m) <= theta (optimality) or <= 0 (feasibility)
+                    if feasible:
+                        upper += value
+                        if value > theta[idx] + tol*max(1,abs(value)):
+                            cuts_A.append(grad),cuts_theta.append(idx),cuts_b.append(grad @ x_m - value)
+                            num_opt += 1
+                    else:
+                        upper = np.inf
+                        cuts_A.append(grad),cuts_theta.append(-1),cuts_b.append(grad @ x_m - value)
+                        num_feas += 1
+                if upper < best[0]:
+                    best = (upper,x_m,[solution[3] for solution in solutions])
+                gap = float((best[0] - lower) / max(1,abs(best[0]))) if np.isfinite(best[0]) else np.inf
+                self.log.append({'iteration':iteration,'bound':float(self.sign*lower),'objective':float(self.sign*best[0]) if np.isfinite(best[0]) else None,'gap':gap,
+                                 'optimality_cuts':num_opt,'feasibility_cuts':num_feas,'time_s':time.perf_counter() - start})
+                if verbose:
+                    print(f"Benders iteration {iteration}: bound {self.sign*lower:.6g}, objective {self.sign*best[0]:.6g}, gap {gap:.3%}, "
+                          f"cuts {num_opt} optimality / {num_feas} feasibility")
+                if gap <= tol or num_opt + num_feas == 0:
+                    self.status = 'optimal'
+                    break
+                if time_limit is not None and time.perf_counter() - start > time_limit:
+                    self.status = 'time limit'
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if best[1] is None:
+            raise Exception('Benders: no feasible solution found, increase max_iter')
+        self.report.update(iterations=len(self.log),cuts=len(cuts_b),gap=self.log[-1]['gap'],bound=self.log[-1]['bound'],time_s=time.perf_counter() - start)
+        with phase('recover'):
+            return self.__recover(best[1],best[2])
+
+    def __solve_master(self,cuts_A,cuts_theta,cuts_b,mipGap):
+        '''Solves the master problem with all cuts; returns the master decisions, the estimated costs of the blocks and the lower bound'''
+        from scipy.optimize import LinearConstraint,Bounds,milp
+        from scipy.sparse import csr_matrix,hstack,vstack
+        num_blocks = len(self.blocks)
+        A = hstack([self.A_master,csr_matrix((self.A_master.shape[0],num_blocks))])
+        b_l = np.where(self.senses_master == '<',-np.inf,self.b_master)
+        b_u = np.where(self.senses_master == '>',np.inf,self.b_master)
+        if cuts_b:
+            theta = np.zeros((len(cuts_b),num_blocks))
+            idx = np.flatnonzero(np.array(cuts_theta) >= 0)
+            theta[idx,np.array(cuts_theta)[idx]] = -1
+            A = vstack([A,csr_matrix(np.hstack([np.array(cuts_A),theta]))])
+            b_l = np.r_[b_l,np.full(len(cuts_b),-np.inf)]
+            b_u = np.r_[b_u,cuts_b]
+        c = np.r_[self.c_master,np.ones(num_blocks)]
+        integrality = np.r_[self.integrality_master,np.zeros(num_blocks,dtype=int)]
+        bounds = Bounds(np.r_[self.lb_master,self.theta_lb],np.r_[self.ub_master,np.full(num_blocks,np.inf)])
+        constraints = [LinearConstraint(A,b_l,b_u)] if A.shape[0] > 0 else []
+        res = milp(c=c,constraints=constraints,integrality=integrality,bounds=bounds,options={'mip_rel_gap':mipGap})
+        if res.x is None:
+            raise Exception(f'Benders: master problem could not be solved ({res.message})')
+        num_master = len(self.master_cols)
+        return res.x[:num_master],res.x[num_master:],res.fun
+
+    def __recover(self,x_m,x_blocks):
+        '''Full result vector from the master decisions; blocks with integer variables are solved again as MILP'''
+        x = np.zeros(self.num_vars)
+        x[self.master_cols] = x_m
+        for block,x_k in zip(self.blocks,x_blocks):
+            x[block.cols] = block.solve_integer(x_m) if block.integrality.any() else x_k
+        return x
+
+
+class _BendersBlock:
+    '''Subproblem of one time block: min c x  s.t.  A_ub x <= b_ub - B_ub x_m,  A_eq x = b_eq - B_eq x_m,  lb <= x <= ub'''
+    def __init__(self,k,cols,A,B,b,senses,c,lb,ub,integrality):
+        self.k = k
+        self.cols = cols
+        self.c = c
+        self.integrality = integrality
+        relax_lb = np.where(integrality >= 2,np.minimum(lb,0),lb)  # relaxation of semi-continuous variables: 0 or [lb,ub]
+        self.bounds = np.column_stack([relax_lb,ub])
+        self.lb,self.ub = lb,ub
+        eq = senses == '='
+        ineq = ~eq
+        sign = np.where(senses[ineq] == '>',-1.0,1.0)
+        self.A_eq,self.B_eq,self.b_eq = A[eq],B[eq],b[eq]
+        self.A_ub = A[ineq].multiply(sign[:,None]).tocsr()
+        self.B_ub = B[ineq].multiply(sign[:,None]).tocsr()
+        self.b_ub = b[ineq]*sign
+
+    def __linprog(self,c,A_ub,b_ub,A_eq,b_eq,bounds):
+        from scipy.optimize import linprog
+        return linprog(c,A_ub=A_ub if A_ub.shape[0] > 0 else None,b_ub=b_ub if A_ub.shape[0] > 0 else None,
+                       A_eq=A_eq if A_eq.shape[0] > 0 else None,b_eq=b_eq if A_eq.shape[0] > 0 else None,bounds=bounds,method='highs')
+
+    def __grad(self,res,B_ub,B_eq):
+        '''Derivative of the optimal value with respect to the master decisions (marginals of the right sides)'''
+        grad = np.zeros(B_ub.shape[1])
+        if B_ub.shape[0] > 0:
+            grad -= B_ub.T @ res.ineqlin.marginals
+        if B_eq.shape[0] > 0:
+            grad -= B_eq.T @ res.eqlin.marginals
+        return grad
+
+    def solve(self,x_m):
+        '''Returns (feasible, optimal value, derivative with respect to x_m, solution); if infeasible the value of the elastic subproblem is returned'''
+        b_ub = self.b_ub - self.B_ub @ x_m
+        b_eq = self.b_eq - self.B_eq @ x_m
+        res = self.__linprog(self.c,self.A_ub,b_ub,self.A_eq,b_eq,self.bounds)
+        if res.status == 0:
+            return True,res.fun,self.__grad(res,self.B_ub,self.B_eq),res.x
+        if res.status != 2:
+            raise Exception(f'Benders: subproblem of block {self.k} could not be solved ({res.message})')
+        # elastic subproblem: min sum of violations s  s.t.  A_ub x - s_ub <= b_ub,  A_eq x + s_plus - s_minus = b_eq
+        from scipy.sparse import hstack,identity,csr_matrix
+        n,m_ub,m_eq = len(self.c),self.A_ub.shape[0],self.A_eq.shape[0]
+        A_ub = hstack([self.A_ub,-identity(m_ub),csr_matrix((m_ub,2*m_eq))]).tocsr()
+        A_eq = hstack([self.A_eq,csr_matrix((m_eq,m_ub)),identity(m_eq),-identity(m_eq)]).tocsr()
+        c = np.r_[np.zeros(n),np.ones(m_ub+2*m_eq)]
+        bounds = np.vstack([self.bounds,np.column_stack([np.zeros(m_ub+2*m_eq),np.full(m_ub+2*m_eq,np.inf)])])
+        res = self.__linprog(c,A_ub,b_ub,A_eq,b_eq,bounds)
+        if res.status != 0:
+            raise Exception(f'Benders: elastic subproblem of block {self.k} could not be solved ({res.message})')
+        return False,res.fun,self.__grad(res,self.B_ub,self.B_eq),None
+
+    def solve_integer(self,x_m):
+        '''Solves the subproblem with integer variables for fixed master decisions'''
+        from scipy.optimize import LinearConstraint,Bounds,milp
+        from scipy.sparse import vstack
+        A = vstack([self.A_ub,self.A_eq])
+        b_u = np.r_[self.b_ub - self.B_ub @ x_m,self.b_eq - self.B_eq @ x_m]
+        b_l = np.r_[np.full(self.A_ub.shape[0],-np.inf),self.b_eq - self.B_eq @ x_m]
+        res = milp(c=self.c,constraints=[LinearConstraint(A,b_l,b_u)] if A.shape[0] > 0 else [],integrality=self.integrality,bounds=Bounds(self.lb,self.ub))
+        if res.x is None:
+            raise Exception(f'Benders: block {self.k} has no integer solution for the master decisions ({res.message})')
+        return res.x
+
+    def lower_bound(self,lb_master,ub_master):
+        '''Lower bound of the costs of the block: the block is solved with the master decisions as free variables within their bounds'''
+        from scipy.sparse import hstack
+        A_ub = hstack([self.A_ub,self.B_ub]).tocsr()
+        A_eq = hstack([self.A_eq,self.B_eq]).tocsr()
+        c = np.r_[self.c,np.zeros(len(lb_master))]
+        bounds = np.vstack([self.bounds,np.column_stack([lb_master,ub_master])])
+        res = self.__linprog(c,A_ub,self.b_ub,A_eq,self.b_eq,bounds)
+        if res.status == 2:
+            raise Exception(f'Benders: block {self.k} is infeasible')
+        if res.status != 0:
+            raise ValueError(f'Benders: no lower bound for the costs of block {self.k} ({res.message}), pass theta_lb')
+        return res.fun
+
+
+_worker_blocks = None
+
+def _init_worker(blocks):
+    '''Sends the subproblems once to every worker process'''
+    global _worker_blocks
+    _worker_blocks = blocks
+
+def _solve_block_worker(idx,x_m):
+    return _worker_blocks[idx].solve(x_m)
@@ -0,0 +1,199 @@
+import os
+import enum
+import hashlib
+import warnings
+import functools
+import numpy as np
+from .lpObject import LPObject
+from .lpStateVar import LPStateVar
+from .lpInputdata import LPInputdata
+from .equation import Equation, EquationBlock, EquationStore
+from .lpProfile import LPProfiler
+from .lpMain import LPMain
+
+class LPCache:
+    '''
+    On-disk cache of assembled equation systems (Aeq, beq, senses, lb, ub, vtypes, f).
+    The cached arrays are stored as compressed .npz files named by a hash of the model. The hash covers the source code of MilPython, the classes
+    and the code of all LPObjects, their parameters, the definitions of the state variables and the input data. If a parameter of an LPObject can
+    not be hashed, the cache is bypassed. If the cache gets larger than max_size_mb, the least recently used files are deleted.
+    '''
+    ARRAYS = ('row','col','data','shape','beq','senses','lb','ub','vtypes','f')
+    # attributes that LPMain sets itself: the assembled model, results and solver state, no parameters of the model
+    MAIN_ATTRIBUTES = frozenset(('Aeq','beq','senses','lb','ub','vtypes','f','x','results','solver_status','solver_info','presolve_report',
+                                 'benders_log','admm_log','persistent_model','profiler'))
+
+    def __init__(self,cache_dir:str,max_size_mb:float=1024):
+        """
+        Args:
+            cache_dir (str): directory of the cache files, is created if it does not exist
+            max_size_mb (float, optional): maximum size of the cache directory in MB. Defaults to 1024.
+        """
+        self.cache_dir = cache_dir
+        self.max_size_mb = max_size_mb
+        os.makedirs(cache_dir,exist_ok=True)
+
+    def key(self,main)->str:
+        '''
+        Returns the hash of the model of the LPMain object main. Has to be called after the positions of the variables are defined.
+        Returns None (with a warning) if a parameter of an LPObject can not be hashed, the model must not be cached then
+        '''
+        try:
+            return self.__key(main)
+        except _Unhashable as error:
+            warnings.warn(f'The model is not cached: {error}')
+            return None
+
+    def __key(self,main):
+        h = hashlib.sha256()
+        h.update(_source_hash().encode())
+        inputdata = main.inputdata
+        self.__update(h,[inputdata.steps,inputdata.num_vars,inputdata.num_vars_timedep])
+        self.__update(h,inputdata.dt_h)
+        self.__update(h,getattr(inputdata,'ordering','time'))
+        self.__update(h,[getattr(inputdata,'period_steps',None),getattr(inputdata,'weights',None)])
+        for key in sorted(inputdata.data,key=str):
+            self.__update(h,[str(key),inputdata.data[key]])
+        for obj in main.obj_lst:
+            self.__update(h,[type(obj).__module__,type(obj).__qualname__,obj.name])
+            for cls in type(obj).__mro__:
+                if cls.__module__.split('.')[0] == __package__.split('.')[0] or cls is object:
+                    continue
+                for attr,value in vars(cls).items():
+                    if attr.startswith('__'):
+                        continue
+                    value = getattr(value,'fget',value)
+                    try:
+                        self.__update(h,[attr,value])
+                    except _Unhashable as error:
+                        raise _Unhashable(f"class attribute '{attr}' of '{cls.__qualname__}' contains {error}, which can not be hashed") from None
+            for attr,value in sorted(vars(obj).items()):
+                if (isinstance(obj,LPMain) and attr in self.MAIN_ATTRIBUTES) or self.__is_model_part(value):
+                    continue
+                try:
+                    self.__update(h,[attr,value])
+                except _Unhashable as error:
+                    raise _Unhashable(f"attribute '{attr}' of '{obj.name}' contains {error}, which can not be hashed") from None
+            for var in obj.stateVar_lst:
+                self.__update(h,[type(var).__name__,var.name,var.pos,var.lb,var.ub,var.vtype,getattr(var,'initial',None)])
+        return h.hexdigest()
+
+    def load(self,main,key:str)->bool:
+        '''Loads the arrays of the cached model into main. Returns False if the model is not in the cache'''
+        from scipy.sparse import coo_matrix
+        path = self.__path(key)
+        try:
+            with np.load(path) as cached:
+                arrays = {name:cached[name] for name in self.ARRAYS}
+        except (OSError,KeyError,ValueError):
+            return False
+        os.utime(path)
+        main.Aeq = coo_matrix((arrays['data'],(arrays['row'],arrays['col'])),shape=tuple(arrays['shape']))
+        main.beq = arrays['beq']
+        main.senses = arrays['senses']
+        main.lb = arrays['lb']
+        main.ub = arrays['ub']
+        main.vtypes = arrays['vtypes'].tolist()
+        main.f = arrays['f']
+        return True
+
+    def store(self,main,key:str):
+        '''Stores the arrays of the model of main in the cache and deletes the least recently used files if the cache is too large'''
+        Aeq = main.Aeq.tocoo()
+        tmp_path = os.path.join(self.cache_dir,f'{key}.{os.getpid()}.tmp.npz')
+        np.savez_compressed(tmp_path,row=Aeq.row,col=Aeq.col,data=Aeq.data,shape=np.array(Aeq.shape),beq=np.asarray(main.beq,dtype=float),
+                            senses=np.asarray(main.senses,dtype='<U1'),lb=main.lb,ub=main.ub,vtypes=np.asarray(main.vtypes,dtype='<U1'),f=main.f)
+        os.replace(tmp_path,self.__path(key))
+        self.evict()
+
+    def evict(self):
+        '''Deletes the least recently used cache files until the cache is smaller than max_size_mb'''
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npz') and not entry.name.endswith('.tmp.npz'):
+                stat = entry.stat()
+                files.append((stat.st_mtime,stat.st_size,entry.path))
+        size = sum(file[1] for file in files)
+        for _,file_size,path in sorted(files):
+            if size <= self.max_size_mb * 1e6:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= file_size
+
+    def __path(self,key):
+        return os.path.join(self.cache_dir,f'{key}.npz')
+
+    def __is_model_part(self,value):
+        '''Attributes that are hashed separately or set up by MilPython: LPObjects, variables, equations, input data and lists of these'''
+        parts = (LPObject,LPStateVar,LPInputdata,Equation,EquationBlock,EquationStore,LPProfiler)
+        if isinstance(value,parts):
+            return True
+        return isinstance(value,(list,tuple)) and len(value) > 0 and all(isinstance(value_i,parts) for value_i in value)
+
+    def __update(self,h,value):
+        '''
+        Adds a value to the hash: numbers, strings, arrays, sparse matrices, functions, classes and (nested) lists, tuples, sets and dicts of these.
+        LPObjects and variables are added by their name. Raises _Unhashable for other objects
+        '''
+        if value is None or isinstance(value,(bool,int,float,complex,str,bytes,np.generic,enum.Enum)):
+            h.update(f'{type(value).__name__}:{value!r};'.encode())
+        elif isinstance(value,(LPObject,LPStateVar)):
+            h.update(f'{type(value).__name__}:{value.name!r};'.encode())
+        elif isinstance(value,(list,tuple,range)):
+            h.update(f'[{len(value)}'.encode())
+            for value_i in value:
+                self.__update(h,value_i)
+            h.update(b']')
+        elif isinstance(value,dict):
+            h.update(f'{{{len(value)}'.encode())
+            for key in sorted(value,key=repr):
+                self.__update(h,[key,value[key]])
+            h.update(b'}')
+        elif isinstance(value,(set,frozenset)):
+            self.__update(h,['set']+sorted(value,key=repr))
+        elif hasattr(value,'tocoo'):
+            coo = value.tocoo()
+            self.__update(h,[coo.shape,coo.row,coo.col,coo.data])
+        elif isinstance(value,np.ndarray) or hasattr(value,'__array__'):
+            array = np.ascontiguousarray(np.asarray(value))
+            h.update(f'{array.dtype.str}{array.shape}'.encode())
+            if array.dtype == object:
+                self.__update(h,array.ravel().tolist())
+            else:
+                h.update(array.tobytes())
+        elif hasattr(getattr(value,'__func__',value),'__code__'):
+            self.__update_code(h,getattr(value,'__func__',value).__code__)
+        elif isinstance(value,type):
+            h.update(f'{value.__module__}.{value.__qualname__};'.encode())
+        else:
+            raise _Unhashable(f'an object of type {type(value).__name__}')
+
+    def __update_code(self,h,code):
+        '''Adds the byte code and the constants of a function to the hash, so changes of the equations invalidate the cache'''
+        h.update(code.co_code)
+        h.update(repr(code.co_names).encode())
+        for const in code.co_consts:
+            if hasattr(const,'co_code'):
+                self.__update_code(h,const)
+            else:
+                h.update(repr(const).encode())
+
+
+class _Unhashable(Exception):
+    '''Raised for parameters of LPObjects that can not be added to the hash of the model'''
+
+
+@functools.lru_cache(maxsize=None)
+def _source_hash()->str:
+    '''Hash of the source files of MilPython, so cached models are invalidated when MilPython changes'''
+    h = hashlib.sha256()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith('.py'):
+            with open(os.path.join(package_dir,name),'rb') as file:
+                h.update(name.encode())
+                h.update(file.read())
+    return h.hexdigest()
@@ -1,18 +1,229 @@
+import numpy as np
+
 class LPInputdata:
     '''
     Class, that contains all input data for the optimization.
     Contains time series as dict
     In der Initialisierung des LPMain-Objekts wird dieser Klasse außerdem die Gesamtanzahl an Variablen zugewiesen
+    With aggregate the time series can be reduced to a few typical periods (e.g. typical days) for long horizons,
+    with resample they can be put onto a coarser, non-uniform grid (dt_h per step)
     '''
-    def __init__(self,data:dict,dt_h:float,verbose=True):
+    def __init__(self,data:dict,dt_h,verbose=True,ordering:str='time'):
         """
         Args:
             data (dict): dictionary of all important input data
-            dt_h (float): stepsize in hours
-        """        
+            dt_h (float or array): stepsize in hours, a single value or an array with one value per step (non-uniform time steps, see resample)
+            ordering (str, optional): order of the time dependent variables in the result vector. 'time': time-major, all variables of a time step
+                                      are next to each other (column pos + t*num_vars_timedep); 'variable': variable-major, the time series of every
+                                      variable is contiguous (column pos + t). Defaults to 'time'.
+        """
+        if ordering not in ('time','variable'):
+            raise ValueError(f"Unknown ordering '{ordering}'. Use 'time' or 'variable'")
         self.data = data                            # dict containing time series input data
         self.steps=len(next(iter(data.items()))[1]) # number of steps                           #! leads to error if first item in data is no time series
-        self.dt_h = dt_h                            # stepsize in hours
+        if np.ndim(dt_h) > 0:
+            dt_h = np.asarray(dt_h,dtype=float)
+            if dt_h.shape != (self.steps,):
+                raise ValueError(f'dt_h must be a single value or an array with one value per step ({self.steps}), got shape {dt_h.shape}')
+        self.dt_h = dt_h                            # stepsize in hours (float or array with one value per step)
         self.num_vars=None                          # total number of stateVariables
         self.num_vars_timedep=None                  # number of time dependent stateVars
-        self.verbose=verbose                        #verbosity of optimization
\ No newline at end of file
+        self.verbose=verbose                        #verbosity of optimization
+        self.ordering=ordering                      # order of the time dependent variables ('time' or 'variable')
+        self.stride=None                            # distance of the columns of two consecutive time steps of a variable, set by LPMain.def_pos
+        self.weights=None                           # weight of every step in the target function (aggregated time series: number of original steps represented)
+        self.period_steps=None                      # number of steps of a typical period (aggregated time series)
+        self.period_assignment=None                 # typical period of every period of the full time series (aggregated time series)
+        self.full_steps=None                        # number of steps of the original time series (aggregated or resampled time series)
+        self.full_dt_h=None                         # stepsize in hours of the original time series (aggregated or resampled time series)
+        self.step_map=None                          # step that represents every step of the original time series (aggregated or resampled time series)
+
+    def dt(self,step:int=None):
+        '''Returns the stepsize in hours of step, without step an array with the stepsize of every step'''
+        if step is not None:
+            return float(self.dt_h[step]) if np.ndim(self.dt_h) > 0 else self.dt_h
+        return np.broadcast_to(np.asarray(self.dt_h,dtype=float),(self.steps,))
+
+    @property
+    def time_h(self)->np.ndarray:
+        '''Start time of every step in hours'''
+        return np.r_[0.0,np.cumsum(self.dt())[:-1]]
+
+    def aggregate(self,period_steps:int,n_periods:int,method:str='kmedoids',keys:list=None,seed:int=0)->'LPInputdata':
+        """
+        Reduces the time series to n_periods typical periods (e.g. typical days with period_steps=96 for 15 minute steps).
+        The periods of the time series are clustered and every cluster is represented by its medoid, an actual period of the time series.
+        Returns new input data, whose time series consist of the typical periods one after another. Its weights contain the number of steps of the full
+        time series every step represents, i.e. the number of periods of its typical period (an incomplete last period only counts with its actual
+        steps); they are applied by LPMain.add_var_targetfun, so the target function corresponds to the full time series.
+        Storages can be made cyclic within every typical period with add_eq_block(...,boundary='periodic'). The results of the model can be mapped back
+        to the full time series with expand.
+
+        Args:
+            period_steps (int): number of steps of one period
+            n_periods (int): number of typical periods
+            method (str, optional): 'kmedoids' or 'hierarchical' (Ward linkage). Defaults to 'kmedoids'.
+            keys (list, optional): keys of the time series that are used for clustering. Defaults to all time series.
+            seed (int, optional): seed of the random start of k-medoids. Defaults to 0.
+
+        Returns:
+            LPInputdata: input data with the typical periods
+        """
+        if method not in ('kmedoids','hierarchical'):
+            raise ValueError(f"Unknown method '{method}'. Use 'kmedoids' or 'hierarchical'")
+        num_periods = -(-self.steps // period_steps)
+        if not 0 < n_periods <= num_periods:
+            raise ValueError(f'n_periods has to be between 1 and the number of periods of the time series ({num_periods})')
+        series = {key:value for key,value in self.data.items() if np.ndim(value) == 1 and len(value) == self.steps}
+        keys = keys if keys is not None else list(series)
+        # one row per period; every time series is scaled to [0,1], so all of them have the same influence
+        features = np.hstack([self.__periods(self.__scale(series[key]),period_steps,num_periods) for key in keys])
+        if method == 'kmedoids':
+            medoids,assignment = self.__kmedoids(features,n_periods,seed)
+        else:
+            medoids,assignment = self.__hierarchical(features,n_periods)
+        data = {}
+        for key,value in self.data.items():
+            if key in series:
+                data[key] = self.__periods(np.asarray(value),period_steps,num_periods)[medoids].ravel()
+            else:
+                data[key] = value
+        dt_h = self.__periods(self.dt_h,period_steps,num_periods)[medoids].ravel() if np.ndim(self.dt_h) > 0 else self.dt_h
+        aggregated = LPInputdata(data,dt_h,self.verbose,self.ordering)
+        step_map = (assignment[:,None]*period_steps + np.arange(period_steps)).ravel()[:self.steps]
+        # number of original steps every step represents, the padded steps of an incomplete last period do not count
+        aggregated.weights = np.bincount(step_map,minlength=len(medoids)*period_steps).astype(float)
+        aggregated.period_steps = period_steps
+        aggregated.period_assignment = assignment
+        self.__set_origin(aggregated,step_map)
+        return aggregated
+
+    def resample(self,dt_h,how:dict=None)->'LPInputdata':
+        """
+        Resamples the time series onto a coarser, possibly non-uniform grid, e.g. fine steps for the next hours and coarse steps further out
+        for model predictive control. Every new step has to cover whole steps of the time series: the step boundaries of dt_h have to be boundaries
+        of the current steps and the total duration has to be the same. Time series are averaged over the duration of the steps ('mean', e.g. powers
+        and prices) or summed up ('sum', e.g. energies per step). The results of the model can be mapped back to the original steps with expand.
+
+        Args:
+            dt_h (float or array): stepsize in hours of the new grid, a single value or an array with one value per new step
+            how (dict, optional): {key:'mean' or 'sum'} for the time series. Defaults to 'mean' for all time series.
+
+        Returns:
+            LPInputdata: input data on the new grid with dt_h as array
+        """
+        if self.weights is not None:
+            raise Exception('Time series that are aggregated into typical periods can not be resampled, resample before aggregate')
+        how = how if how is not None else {}
+        dt_old = self.dt()
+        end = np.cumsum(dt_old)
+        if np.ndim(dt_h) == 0:
+            n = int(round(end[-1] / dt_h))
+            dt_new = np.full(n,float(dt_h))
+        else:
+            dt_new = np.asarray(dt_h,dtype=float)
+        # last original step of every new step
+        end_new = np.cumsum(dt_new)
+        last = np.searchsorted(end,end_new - 1e-9*max(end[-1],1))
+        if not np.isclose(end_new[-1],end[-1]) or np.any(last >= self.steps) or not np.allclose(end[np.minimum(last,self.steps-1)],end_new):
+            raise ValueError('The steps of dt_h have to cover whole steps of the time series and have the same total duration')
+        if np.any(np.diff(last) <= 0):
+            raise ValueError('Every step of dt_h has to cover at least one step of the time series')
+        group = np.repeat(np.arange(len(dt_new)),np.diff(np.r_[-1,last]))
+        data = {}
+        for key,value in self.data.items():
+            if np.ndim(value) != 1 or len(value) != self.steps:
+                data[key] = value
+                continue
+            mode = how.get(key,'mean')
+            if mode not in ('mean','sum'):
+                raise ValueError(f"Unknown resampling '{mode}' for '{key}'. Use 'mean' or 'sum'")
+            value = np.asarray(value,dtype=float)
+            total = np.bincount(group,weights=value*dt_old if mode == 'mean' else value,minlength=len(dt_new))
+            data[key] = total / dt_new if mode == 'mean' else total
+        resampled = LPInputdata(data,dt_new,self.verbose,self.ordering)
+        self.__set_origin(resampled,group)
+        return resampled
+
+    def __set_origin(self,new,step_map):
+        '''Stores in new input data, which of its steps represents every step of the original time series (also over several aggregations)'''
+        new.step_map = step_map[self.step_map] if self.step_map is not None else step_map
+        new.full_steps = self.full_steps if self.full_steps is not None else self.steps
+        new.full_dt_h = self.full_dt_h if self.full_dt_h is not None else self.dt_h
+
+    def expand(self,result,how:str='repeat')->np.ndarray:
+        '''
+        Maps results of a model with aggregated or resampled input data back to the steps of the original time series.
+        result can be a stateVar (its result is used) or an array with the steps along the first axis (e.g. LPResults.timedep)
+        how: 'repeat' gives every original step the value of the step that represents it (powers, states of charge),
+        'split' distributes the value in proportion to the duration of the original steps (energies per step)
+        '''
+        if self.step_map is None:
+            raise Exception('expand is only possible for input data created with aggregate or resample')
+        if how not in ('repeat','split'):
+            raise ValueError(f"Unknown expansion '{how}'. Use 'repeat' or 'split'")
+        result = result.result if hasattr(result,'result') else result
+        expanded = np.asarray(result,dtype=float)[self.step_map]
+        if how == 'split':
+            share = np.broadcast_to(self.full_dt_h,(self.full_steps,)) / self.dt()[self.step_map]
+            expanded = expanded * share.reshape((-1,)+(1,)*(expanded.ndim-1))
+        return expanded
+
+    def expand_index(self)->np.ndarray:
+        '''Returns for every step of the original time series the step that represents it'''
+        if self.step_map is None:
+            raise Exception('expand is only possible for input data created with aggregate or resample')
+        return self.step_map
+
+    def __periods(self,values,period_steps,num_periods):
+        '''Time series as array with one row per period; an incomplete last period is padded with its last value'''
+        values = np.pad(np.asarray(values),(0,num_periods*period_steps-len(values)),mode='edge')
+        return values.reshape(num_periods,period_steps)
+
+    def __scale(self,values):
+        values = np.asarray(values,dtype=float)
+        span = values.max() - values.min()
+        return (values - values.min()) / span if span > 0 else np.zeros_like(values)
+
+    def __kmedoids(self,features,n_periods,seed,max_iter=100):
+        '''k-medoids (alternating) with k-medoids++ start. Returns the indices of the medoids and the cluster of every period'''
+        from scipy.spatial.distance import cdist
+        dist = cdist(features,features)
+        rng = np.random.default_rng(seed)
+        medoids = [int(rng.integers(len(features)))]
+        for _ in range(1,n_periods):
+            d = dist[:,medoids].min(axis=1)**2
+            if d.sum() > 0:
+                medoids.append(int(rng.choice(len(features),p=d/d.sum())))
+            else:
+                # all periods equal the medoids, any period that is not a medoid yet
+                medoids.append(int(rng.choice(np.setdiff1d(np.arange(len(features)),medoids))))
+        medoids = np.array(medoids)
+        for _ in range(max_iter):
+            assignment = dist[:,medoids].argmin(axis=1)
+            new_medoids = medoids.copy()
+            for cluster in range(n_periods):
+                members = np.flatnonzero(assignment == cluster)
+                if len(members) > 0:
+                    new_medoids[cluster] = members[dist[np.ix_(members,members)].sum(axis=1).argmin()]
+            if np.array_equal(new_medoids,medoids):
+                break
+            medoids = new_medoids
+        assignment = dist[:,medoids].argmin(axis=1)
+        return medoids,assignment
+
+    def __hierarchical(self,features,n_periods):
+        '''Agglomerative clustering (Ward). Returns the indices of the medoids and the cluster of every period'''
+        from scipy.cluster.hierarchy import linkage,fcluster
+        from scipy.spatial.distance import cdist
+        if len(features) == 1:
+            return np.array([0]),np.array([0])
+        labels = fcluster(linkage(features,method='ward'),n_periods,criterion='maxclust') - 1
+        clusters = np.unique(labels)
+        medoids = np.empty(len(clusters),dtype=int)
+        assignment = np.empty(len(features),dtype=int)
+        for idx,cluster in enumerate(clusters):
+            members = np.flatnonzero(labels == cluster)
+            medoids[idx] = members[cdist(features[members],features[members]).sum(axis=1).argmin()]
+            assignment[members] = idx
+        return medoids,assignment
@@ -1,56 +1,115 @@
-from scipy.sparse import vstack
-import gurobipy as gp
 import numpy as np
 from .lpObject import LPObject
 from .lpStateVar import LPStateVar,LPStateVar_timedep,LPStateVar_add
 from .lpInputdata import LPInputdata
-from scipy.sparse import coo_matrix, csc_matrix, vstack
 from .tools import Solver,Obj
+from .lpProfile import LPProfiler
 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import sympy as sp
-import tkinter as tk
-from tkinter import font as tkfont
-from tkinter import filedialog
-from tkinter import ttk
-import tempfile
+# solver backends, scipy.sparse, plotting and GUI packages are imported in the methods that need them,
+# so importing MilPython stays fast and works on machines without Gurobi, Tk or a display
 
 class LPMain:
     '''
     (Abstract) main class for running the linear optimization
     Here the equation systems are prepared for optimization and the optimization is executed
     '''
-    def __init__(self,inputdata:LPInputdata):
-        """This is the init-fun of the abstract class LPMain. This code has to be run by inheriting class by >LPMain().__init__(self,inputdata)"""        
+    def __init__(self,inputdata:LPInputdata,cache_dir:str=None,cache_size_mb:float=1024,track_memory:bool=False,profile_hook=None):
+        """This is the init-fun of the abstract class LPMain. This code has to be run by inheriting class by >LPMain().__init__(self,inputdata)
+        
+        Args:
+            inputdata (LPInputdata): input data of the optimization
+            cache_dir (str, optional): directory of an on-disk cache of assembled models. If the same model (classes, parameters, variables and input data)
+                                       was set up before, the equation system is loaded from the cache and def_equations is not run. Models with parameters
+                                       that can not be hashed are not cached. Defaults to None (no cache).
+            cache_size_mb (float, optional): maximum size of the cache directory, least recently used models are deleted. Defaults to 1024.
+            track_memory (bool, optional): record the peak memory of every phase of set up and optimization in addition to the wall time (see profile_report). Defaults to False.
+            profile_hook (callable, optional): function that is called with the record of every finished phase, e.g. to forward it to a metrics system. Defaults to None.
+        """        
         if self.__class__.__name__ == 'LPMain':
             raise Exception('This is an abstract class. Please only instantiate objects of the inheriting class.')
         self.Aeq = None
-        self.beq = []
-        self.senses = []
+        self.beq = np.zeros(0)
+        self.senses = np.zeros(0,dtype='<U1')
         self.inputdata = inputdata
-        self.make_stateVarLst()
-        self.def_pos()
-        self.def_bounds()
-        self.def_vtypes()
+        self.persistent_model = None
+        self.x = None
+        self.results = None
+        self.solver_status = None
+        self.solver_info = {}
+        self.presolve_report = None
+        self.benders_log = []
+        self.admm_log = []
+        self.profiler = LPProfiler(track_memory,profile_hook)
+        with self.profiler.phase('setup'):
+            self.make_stateVarLst()
+            self.def_pos()
+        if cache_dir is not None:
+            from .lpCache import LPCache
+            cache = LPCache(cache_dir,cache_size_mb)
+            with self.profiler.phase('cache_load') as record:
+                cache_key = cache.key(self)
+                record['hit'] = cache_key is not None and cache.load(self,cache_key)
+            if record['hit']:
+                return
+        self.__build_model()
+        if cache_dir is not None and cache_key is not None:
+            with self.profiler.phase('cache_store'):
+                cache.store(self,cache_key)
+    
+    def update_model(self):
+        '''
+        Sets up bounds, variable types, equations and target function again, e.g. after the input data or the parameters of the LPObjects were changed.
+        The positions of the variables are kept, so with optimize(persistent=True) only the changed values are transferred to the solver afterwards
+        '''
+        with self.profiler.phase('update_model'):
+            for obj in self.obj_lst:
+                obj.eq_store.clear()
+                obj.eq_blocks = []
+            self.__build_model()
+    
+    def __build_model(self):
+        '''Sets up bounds, variable types, equations and target function, every step is recorded as a phase of the profiler'''
+        with self.profiler.phase('def_bounds'):
+            self.def_bounds()
+        with self.profiler.phase('def_vtypes'):
+            self.def_vtypes()
         self.def_eqs()
-        self.init_targetfun()
-        self.def_targetfun()
+        with self.profiler.phase('def_targetfun'):
+            self.init_targetfun()
+            self.def_targetfun()
     
     def def_eqs(self):
-        """Defines the equation system. Calls the def_equation function for all LPObjects in self.obj_lst and extends Aeq,beq and senses by the equations of the objects"""        
-        self.obj_lst[0].def_equations()
-        self.Aeq,self.beq,self.senses = self.obj_lst[0].return_eqs()
-        for obj in self.obj_lst[1:]:
-            obj.def_equations()
-            self.extend_matrices(obj.return_eqs())
+        """
+        Defines the equation system. Calls the def_equation function for all LPObjects in self.obj_lst and builds Aeq,beq and senses from the equations of all objects.
+        The row, col and data arrays of the objects are collected first and shifted by the row offset of each object, so the matrix is assembled only once
+        """        
+        from scipy.sparse import coo_matrix
+        with self.profiler.phase('def_eqs'):
+            row_lst,col_lst,data_lst,beq_lst,senses_lst = [],[],[],[],[]
+            num_rows = 0
+            for obj in self.obj_lst:
+                obj_label = obj.name if obj.name else type(obj).__name__
+                with self.profiler.phase('def_equations',obj_label):
+                    obj.def_equations()
+                with self.profiler.phase('return_triplets',obj_label):
+                    row,col,data,beq,senses = obj.return_triplets()
+                row_lst.append(row + num_rows)
+                col_lst.append(col)
+                data_lst.append(data)
+                beq_lst.append(np.asarray(beq,dtype=float))
+                senses_lst.append(np.asarray(senses,dtype='<U1'))
+                num_rows += len(beq)
+            with self.profiler.phase('assemble'):
+                self.Aeq = coo_matrix((np.concatenate(data_lst),(np.concatenate(row_lst),np.concatenate(col_lst))),shape=(num_rows,self.inputdata.num_vars))
+                self.beq = np.concatenate(beq_lst)
+                self.senses = np.concatenate(senses_lst)
     
     def extend_matrices(self,eq_lst):
         '''Appends equations from other classes to the equation system of the LPMain object'''
+        from scipy.sparse import vstack
         self.Aeq = vstack([self.Aeq,eq_lst[0]])
-        self.beq.extend(eq_lst[1])
-        self.senses.extend(eq_lst[2])
+        self.beq = np.concatenate([self.beq,np.asarray(eq_lst[1],dtype=float)])
+        self.senses = np.concatenate([self.senses,np.asarray(eq_lst[2],dtype='<U1')])
     
     def make_stateVarLst(self):
         '''
@@ -66,13 +125,17 @@ class LPMain:
     def def_pos(self):
         '''
         Defines the positions of all state variables within the Aeq matrix.
-        - For time-dependent variables, the position of the variable is saved for the first time step
+        - For time-dependent variables, the position of the variable is saved for the first time step. The column of time step t is pos + t*inputdata.stride:
+          with inputdata.ordering='time' (time-major) the variables of one time step are next to each other (stride = number of time dependent variables),
+          with 'variable' (variable-major) the time series of every variable is contiguous (stride = 1)
         - Additional variables are at the end of the list
         '''
+        variable_major = getattr(self.inputdata,'ordering','time') == 'variable'
         idx_pos=0
         for var in self.stateVars_timedep:
-            var.pos = idx_pos
+            var.pos = idx_pos*self.inputdata.steps if variable_major else idx_pos
             idx_pos += 1
+        self.inputdata.stride = 1 if variable_major else len(self.stateVars_timedep)
         idx_pos = len(self.stateVars_timedep)*self.inputdata.steps
         for var in self.stateVars_add:
             var.pos = idx_pos
@@ -80,10 +143,17 @@ class LPMain:
         self.inputdata.num_vars=idx_pos
         self.inputdata.num_vars_timedep=len(self.stateVars_timedep)
 
+    def var_slice(self,var:LPStateVar_timedep,start:int=0,stop:int=None)->slice:
+        '''Returns the slice of the columns of the time dependent variable var for the time steps start to stop (exclusive, defaults to all time steps)'''
+        stop = stop if stop is not None else self.inputdata.steps
+        stride = self.inputdata.stride
+        return slice(var.pos+start*stride,var.pos+stop*stride,stride)
+
     def def_bounds(self):
         '''
-        Creates lists containing the upper and lower limits of all state variables.
+        Creates arrays containing the upper and lower limits of all state variables.
         The order corresponds to the positions assigned to the variables
+        The bounds of time dependent variables can be single values or arrays with one value per time step; both are written with strided assignment
         '''
         num_vars_timedep = len(self.stateVars_timedep)*self.inputdata.steps
         num_vars_add = len(self.stateVars_add)
@@ -91,13 +161,9 @@ class LPMain:
         self.lb=np.zeros(num_vars)
         self.ub=np.zeros(num_vars)
         
-        lb_timedep = []
-        ub_timedep = []
         for var in self.stateVars_timedep:
-            lb_timedep.append(var.lb)   
-            ub_timedep.append(var.ub)   
-        self.lb[0:num_vars_timedep] = lb_timedep*self.inputdata.steps
-        self.ub[0:num_vars_timedep] = ub_timedep*self.inputdata.steps
+            self.lb[self.var_slice(var)] = self.__time_bound(var,var.lb)
+            self.ub[self.var_slice(var)] = self.__time_bound(var,var.ub)
                 
         lb_add=[]
         ub_add=[]
@@ -107,6 +173,15 @@ class LPMain:
         self.lb[num_vars_timedep:] = lb_add
         self.ub[num_vars_timedep:] = ub_add
     
+    def __time_bound(self,var,bound):
+        '''Checks a bound of a time dependent variable: single value or array with one value per time step'''
+        if np.ndim(bound) == 0:
+            return bound
+        bound = np.asarray(bound,dtype=float)
+        if bound.shape != (self.inputdata.steps,):
+            raise ValueError(f"The bounds of '{var.name}' must be single values or arrays with {self.inputdata.steps} values (one per time step), got shape {bound.shape}")
+        return bound
+    
     def def_vtypes(self):
         '''
         Creates lists containing the variable type of all state variables.
@@ -120,7 +195,11 @@ class LPMain:
         vtypes_timedep = []
         for var in self.stateVars_timedep:
             vtypes_timedep.append(var.vtype)   
-        self.vtypes.extend(vtypes_timedep*self.inputdata.steps)                
+        if self.inputdata.stride == 1:
+            for vtype in vtypes_timedep:
+                self.vtypes.extend([vtype]*self.inputdata.steps)
+        else:
+            self.vtypes.extend(vtypes_timedep*self.inputdata.steps)                
         vtypes_add=[]
         for var in self.stateVars_add:
             vtypes_add.append(var.vtype)
@@ -133,67 +212,420 @@ class LPMain:
     def def_targetfun(self):
         pass
     
-    def add_var_targetfun(self,var:LPStateVar,value,step=0):
+    def add_var_targetfun(self,var:LPStateVar,value,step=0,accumulate=False):
         '''
         Adds a variable to the target function
         To do this, the StateVar, the desired time step and the weighting for the target function must be transferred
         For additional variables: don't add a variable for step
+        For time dependent variables value can also be a list/array of weights (e.g. a price vector); it is written to the time steps step, step+1, ...
+        with one strided numpy operation, so no loop over the time steps is necessary
+        accumulate: False (default) overwrites the weight that was set before for this variable and step, True adds the value to it.
+        With accumulate=True several cost terms for the same variable can be combined (e.g. energy price + grid fees + emissions)
+        If the input data has weights (time series aggregated into typical periods, see LPInputdata.aggregate), the values of time dependent
+        variables are multiplied by the weight of their time step, so the target function corresponds to the full time series
         '''
-        self.f[var.pos+step*len(self.stateVars_timedep)]=value
+        stride = self.inputdata.stride
+        weights = self.inputdata.weights if isinstance(var,LPStateVar_timedep) else None
+        if np.ndim(value) == 0:
+            idx = var.pos+step*stride if isinstance(var,LPStateVar_timedep) else var.pos
+            if weights is not None:
+                value = value*weights[step]
+        else:
+            value = np.asarray(value,dtype=float)
+            if not isinstance(var,LPStateVar_timedep):
+                raise ValueError(f"Only time dependent variables can get a weight per time step ('{var.name}' is an additional variable)")
+            if value.ndim != 1 or step+len(value) > self.inputdata.steps:
+                raise ValueError(f"The weights for '{var.name}' must be a 1d array with at most {self.inputdata.steps-step} values, got shape {value.shape}")
+            idx = self.var_slice(var,step,step+len(value))
+            if weights is not None:
+                value = value*weights[step:step+len(value)]
+        if accumulate:
+            self.f[idx]+=value
+        else:
+            self.f[idx]=value
         
         
-    def optimize(self,mipGap=0.00,solver:Solver=Solver.GUROBI,objective:Obj=Obj.MINIMIZE):
-        '''Performs the linear optimization of the system of equations set up'''
+    def optimize(self,mipGap=0.00,solver:Solver=Solver.GUROBI,objective:Obj=Obj.MINIMIZE,persistent=False,warm_start=False,threads:int=None,time_limit:float=None,presolve=False):
+        '''
+        Performs the linear optimization of the system of equations set up
+        With persistent=True the solver model (Gurobi, CPLEX and HiGHS) is kept after solving. As long as the structure of the equation system
+        (Aeq, senses, vtypes) stays the same, later calls with persistent=True only transfer the changed values of f, lb, ub and beq to it,
+        e.g. after changing self.f directly or after update_model()
+        warm_start: True reuses the result of the last optimization (self.x) as start solution, alternatively a start vector can be passed.
+        It is handed to the solver as MIP start (Gurobi, CPLEX, HiGHS); the scipy solver does not support start solutions and ignores it
+        threads: maximum number of threads of the solver (Gurobi, CPLEX, HiGHS). Defaults to the setting of the solver
+        time_limit: maximum solving time in seconds. Defaults to no limit
+        The status reported by the solver is stored in self.solver_status, runtime, node and iteration counts reported by the solver in self.solver_info
+        The time for transferring the model and solving it is recorded in the phases 'optimize/solver' and 'optimize/solver/solve' (see profile_report)
+        presolve: True reduces the equation system before it is passed to the solver (fixed variables, equations with one variable, empty and duplicate
+        rows and columns, see LPPresolve). The removed variables are filled in afterwards, what was removed is stored in self.presolve_report.
+        The reduced model is not kept, so persistent is ignored with presolve
+        '''
+        x0 = self.__start_vector(warm_start)
+        self.solver_info = {'solver':solver.name}
+        with self.profiler.phase('optimize') as record:
+            with self.profiler.phase('solver'):
+                if presolve:
+                    x=self.__solve_presolved(solver,mipGap,objective,x0,threads,time_limit)
+                else:
+                    x=self.__solve(solver,mipGap,objective,persistent,x0,threads,time_limit)
+            with self.profiler.phase('assign_results'):
+                self.assign_results(x)
+            self.solver_info['status'] = self.solver_status
+            record['solver_info'] = dict(self.solver_info)
+    
+    def __solve(self,solver,mipGap,objective,persistent,x0,threads,time_limit):
+        '''Passes the equation system to the chosen solver and returns the result vector'''
         if solver == Solver.GUROBI:
-            x=self.solver_gurobi(mipGap,objective)
+            return self.solver_gurobi(mipGap,objective,persistent,x0,threads,time_limit)
         elif solver == Solver.SCIPY:
-            x=self.solver_scipy(mipGap,objective)
+            return self.solver_scipy(mipGap,objective,time_limit)
         elif solver == Solver.CPLEX:
-            x=self.solver_cplex(mipGap,objective)
+            return self.solver_cplex(mipGap,objective,persistent,x0,threads,time_limit)
+        elif solver == Solver.HIGHS:
+            return self.solver_highs(mipGap,objective,persistent,x0,threads,time_limit)
+        raise Exception('This Solver is not implemented')
+    
+    def __solve_presolved(self,solver,mipGap,objective,x0,threads,time_limit):
+        '''Reduces the equation system with LPPresolve, solves the reduced system and returns the full result vector'''
+        from .lpPresolve import LPPresolve
+        with self.profiler.phase('presolve'):
+            presolve = LPPresolve(self,objective)
+            reduced = _LPSnapshot(self,presolve)
+            reduced.profiler,reduced.solver_info = self.profiler,self.solver_info
+        self.presolve_report = presolve.report
+        if len(presolve.col_map) == 0:
+            self.solver_status = 'solved by presolve'
+            return presolve.postsolve(np.zeros(0))
+        x0 = presolve.reduce_vector(x0) if x0 is not None else None
+        x = reduced.__solve(solver,mipGap,objective,False,x0,threads,time_limit)
+        self.solver_status = reduced.solver_status
+        return presolve.postsolve(x)
+    
+    def profile_report(self)->dict:
+        '''
+        Returns the recorded wall times (and peak memory with track_memory=True) of the phases of set up and optimization:
+        'phases': sums per phase (e.g. 'def_eqs/assemble', 'optimize/solver/solve'), 'objects': times per LPObject, 'records': single records
+        and 'solver': information reported by the solver in the last optimization (runtime, nodes, iterations, gap)
+        '''
+        report = self.profiler.report()
+        report['solver'] = dict(self.solver_info)
+        return report
+    
+    def optimize_batch(self,scenarios:list[dict],max_workers:int=None,threads:int=None,**kwargs)->list[dict]:
+        '''
+        Optimizes several scenarios of the same model in parallel processes.
+        The equation system of every scenario is set up in this process (update_model) and only the assembled arrays are sent to the worker processes,
+        so the LPObjects do not have to be pickled. Afterwards the model is set up again with the original data.
+        
+        Args:
+            scenarios (list): one dict per scenario with the changes compared to the current model. Keys are either keys of inputdata.data (value: new time series or value)
+                              or tuples (LPObject,attribute name) to change parameters of the objects, e.g. {'electricity_price':prices,(building.bat,'eta_charge'):0.9}
+            max_workers (int, optional): number of worker processes. Defaults to the number of cores; 1 solves all scenarios in this process
+            threads (int, optional): solver threads per worker. Defaults to the number of cores divided by the number of workers, so the cores are not oversubscribed
+            kwargs: further arguments for optimize (mipGap, solver, objective, ...)
+
+        Returns:
+            list[dict]: one dict per scenario with the result vector 'x', the value of the target function 'objective' and 'results' {stateVar:result}
+        '''
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        num_cores = os.cpu_count() or 1
+        max_workers = min(max_workers or num_cores,max(len(scenarios),1))
+        kwargs['threads'] = threads if threads is not None else max(1,num_cores // max_workers)
+        kwargs['persistent'] = False
+        snapshots = []
+        data = self.inputdata.data
+        try:
+            for scenario in scenarios:
+                params = self.__apply_scenario(scenario,data)
+                try:
+                    self.update_model()
+                    snapshots.append(_LPSnapshot(self))
+                finally:
+                    for (obj,attr),value in params.items():
+                        setattr(obj,attr,value)
+        finally:
+            self.inputdata.data = data
+            self.update_model()
+        if max_workers == 1:
+            x_lst = [_optimize_snapshot(snapshot,kwargs) for snapshot in snapshots]
         else:
-            raise Exception('This Solver is not implemented')
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                x_lst = list(executor.map(_optimize_snapshot,snapshots,[kwargs]*len(snapshots)))
+        results = []
+        for snapshot,x in zip(snapshots,x_lst):
+            res = {'x':x,'objective':float(snapshot.f @ x)}
+            res['results'] = {var:x[self.var_slice(var)] for var in self.stateVars_timedep}
+            res['results'].update({var:x[var.pos] for var in self.stateVars_add})
+            results.append(res)
+        return results
+    
+    def __apply_scenario(self,scenario:dict,data:dict)->dict:
+        '''Sets the input data and the parameters of a scenario (see optimize_batch); returns the previous values of the changed parameters'''
+        self.inputdata.data = dict(data)
+        params = {}
+        for key,value in scenario.items():
+            if isinstance(key,tuple):
+                obj,attr = key
+                params[key] = getattr(obj,attr)
+                setattr(obj,attr,value)
+            else:
+                self.inputdata.data[key] = value
+        return params
+    
+    def optimize_benders(self,block_steps:int,max_iter:int=50,tol:float=1e-4,workers:int=1,objective:Obj=Obj.MINIMIZE,mipGap=0.00,
+                         time_limit:float=None,theta_lb:float=None):
+        '''
+        Optimizes the model with Benders decomposition (see LPBenders): the additional variables (e.g. capacities or investment decisions) form the
+        master problem, the time dependent variables are split into subproblems of block_steps steps, which exchange optimality and feasibility cuts
+        with the master problem. Variables of equations that couple different blocks (e.g. storage states at the block boundaries) are moved to the master problem.
+        The master problem is solved with the scipy MILP solver, the subproblems as LPs with the scipy HiGHS interface, in parallel processes if workers > 1.
+        Integer time dependent variables are relaxed in the subproblems and only solved with the final master decisions, so the result is then not necessarily optimal.
+        The progress per iteration is stored in self.benders_log, bounds, gap and size of the master problem in self.solver_info
+
+        Args:
+            block_steps (int): number of time steps per subproblem (e.g. the steps of a month)
+            max_iter (int, optional): maximum number of iterations. Defaults to 50.
+            tol (float, optional): relative gap between lower and upper bound at which the iterations stop. Defaults to 1e-4.
+            workers (int, optional): number of processes that solve the subproblems. Defaults to 1.
+            objective (Obj, optional): direction of the optimization. Defaults to Obj.MINIMIZE.
+            mipGap (float, optional): relative MIP gap of the master problem. Defaults to 0.
+            time_limit (float, optional): maximum time in seconds of the iterations, the remaining time is also the time limit of every subproblem.
+                                          Defaults to no limit.
+            proximal (float, optional): weight of the proximal term of the subproblems relative to rho, keeps their QP strictly convex. Defaults to 1e-2.
+            theta_lb (float, optional): lower bound of the costs of every block, needed if the costs of a block are unbounded for free master variables.
+                                        Defaults to a bound computed from the relaxation of every block.
+        '''
+        from .lpBenders import LPBenders
+        self.solver_info = {}
+        with self.profiler.phase('optimize_benders'):
+            with self.profiler.phase('decompose'):
+                benders = LPBenders(self,block_steps,objective,theta_lb)
+            x = benders.solve(max_iter,tol,workers,mipGap,time_limit,self.inputdata.verbose,self.profiler)
+            self.benders_log = benders.log
+            self.solver_status = benders.status
+            self.solver_info.update(benders.report)
+            self.solver_info['status'] = benders.status
+            with self.profiler.phase('assign_results'):
+                self.assign_results(x)
+
+    def optimize_admm(self,subsystems:list[LPObject]=None,rho:float=1.0,max_iter:int=200,tol:float=1e-3,workers:int=1,objective:Obj=Obj.MINIMIZE,
+                      adaptive_rho=True,time_limit:float=None,proximal:float=1e-2):
+        '''
+        Optimizes the model distributed with ADMM (see LPADMM), e.g. a district with many buildings that are only coupled by a shared grid connection.
+        Every subsystem (an LPObject and the LPObjects it references) is solved as its own subproblem (HiGHS QP, in parallel processes if workers > 1),
+        the remaining objects form the coordinator; equations with variables of several of these groups are the coupling equations.
+        Integer variables are relaxed during the iterations and solved in the primal recovery, so the result is not necessarily optimal.
+        The results are assigned to var.result as after optimize. The progress per iteration (objective, primal and dual residual, violation of the
+        coupling equations, rho) is stored in self.admm_log, the final residuals and the violation after the recovery in self.solver_info
+
+        Args:
+            subsystems (list, optional): LPObjects that are solved as subproblems together with the LPObjects they reference.
+                                         Defaults to all objects of obj_lst that are not referenced by another object (top-level objects), this
+                                         includes objects only referenced by main (e.g. a shared grid connection), so the coordinator only
+                                         contains the variables of main itself.
+            rho (float, optional): initial penalty parameter. Defaults to 1.0.
+            max_iter (int, optional): maximum number of iterations. Defaults to 200.
+            tol (float, optional): relative tolerance of primal and dual residual. Defaults to 1e-3.
+            workers (int, optional): number of processes that solve the subproblems. Defaults to 1.
+            objective (Obj, optional): direction of the optimization. Defaults to Obj.MINIMIZE.
+            adaptive_rho (bool, optional): adapt rho to balance primal and dual residual. Defaults to True.
+            time_limit (float, optional): maximum time in seconds of the iterations, the remaining time is also the time limit of every subproblem.
+                                          Defaults to no limit.
+            proximal (float, optional): weight of the proximal term of the subproblems relative to rho, keeps their QP strictly convex. Defaults to 1e-2.
+        '''
+        from .lpADMM import LPADMM
+        self.solver_info = {}
+        with self.profiler.phase('optimize_admm'):
+            with self.profiler.phase('decompose'):
+                admm = LPADMM(self,subsystems,objective)
+            x = admm.solve(rho,max_iter,tol,workers,adaptive_rho,time_limit,self.inputdata.verbose,self.profiler,proximal)
+            self.admm_log = admm.log
+            self.solver_status = admm.status
+            self.solver_info.update(admm.report)
+            with self.profiler.phase('assign_results'):
+                self.assign_results(x)
+
+    def optimize_rolling(self,horizon:int,shift:int,carry:list[LPStateVar_timedep]=None,**kwargs):
+        '''
+        Rolling horizon optimization (model predictive control): the model is optimized for a window of horizon steps, the first shift steps are committed,
+        the window is moved by shift steps and optimized again until the whole time series of the input data is covered.
+        The positions of the variables are defined once for the window length, the equation system is set up again for every window from its input data
+        (update_model, def_equations and def_targetfun run once per window). The solver model is kept (persistent=True, unless passed otherwise): if the
+        matrix is unchanged, only the changed bounds, right sides and target function coefficients are transferred to the solver, otherwise the solver
+        model is built again. Time series in inputdata.data, a stepsize per step (inputdata.dt_h), the weights of the steps and time dependent bounds
+        (arrays) of the variables are cut into the windows, the last window is padded with the last value.
+        The end state of the committed steps of the variables in carry is set as stateVar.initial of the next window (use boundary='fixed' or stateVar.initial
+        in the equations of these variables). After the run, the committed results of all windows are stored in var.result for the full time series.
+        
+        Args:
+            horizon (int): number of steps of each optimization window
+            shift (int): number of steps that are committed before the window is moved
+            carry (list, optional): time dependent state variables (e.g. storage states), whose state is passed on to the next window
+            kwargs: further arguments for optimize (mipGap, solver, objective, ...)
+        '''
+        if not 0 < shift <= horizon:
+            raise ValueError('shift has to be between 1 and horizon')
+        carry = carry if carry is not None else []
+        kwargs.setdefault('persistent',True)
+        data_full,steps_full,weights_full,dt_full = self.inputdata.data,self.inputdata.steps,self.inputdata.weights,self.inputdata.dt_h
+        initial_full = [var.initial for var in carry]
+        bounds_full = {var:(var.lb,var.ub) for var in self.stateVars_timedep if np.ndim(var.lb) > 0 or np.ndim(var.ub) > 0}
+        results = {var:np.zeros(steps_full) for var in self.stateVars_timedep}
+        try:
+            self.inputdata.steps = horizon
+            self.def_pos()
+            for start in range(0,steps_full,shift):
+                self.inputdata.data = {key:self.__window(value,start,horizon,steps_full) for key,value in data_full.items()}
+                self.inputdata.weights = self.__window(weights_full,start,horizon,steps_full) if weights_full is not None else None
+                self.inputdata.dt_h = self.__window(dt_full,start,horizon,steps_full)
+                for var,(lb,ub) in bounds_full.items():
+                    var.lb,var.ub = self.__window(lb,start,horizon,steps_full),self.__window(ub,start,horizon,steps_full)
+                self.update_model()
+                self.optimize(**kwargs)
+                num_commit = min(shift,steps_full-start)
+                for var in self.stateVars_timedep:
+                    results[var][start:start+num_commit] = var.result[:num_commit]
+                for var in carry:
+                    var.initial = float(var.result[num_commit-1])
+            results_add = {var:var.result for var in self.stateVars_add}
+        finally:
+            self.inputdata.data,self.inputdata.steps,self.inputdata.weights,self.inputdata.dt_h = data_full,steps_full,weights_full,dt_full
+            for var,initial in zip(carry,initial_full):
+                var.initial = initial
+            for var,(lb,ub) in bounds_full.items():
+                var.lb,var.ub = lb,ub
+            self.def_pos()
+            self.update_model()
+        # stitch the committed steps into a result vector of the full model
+        x = np.zeros(self.inputdata.num_vars)
+        for var,result in results.items():
+            x[self.var_slice(var)] = result
+        for var,result in results_add.items():
+            x[var.pos] = result
         self.assign_results(x)
     
+    def __window(self,value,start,horizon,steps_full):
+        '''Cuts the window [start,start+horizon) out of a time series of the input data and pads it with the last value at the end. Other data is passed unchanged'''
+        if np.ndim(value) == 0 or len(value) != steps_full:
+            return value
+        window = np.asarray(value)[start:start+horizon]
+        if len(window) < horizon:
+            window = np.pad(window,(0,horizon-len(window)),mode='edge')
+        return window
+    
     def assign_results(self,x):
-        '''Assigns the results of the result vector x to the state variables'''
+        '''
+        Assigns the results of the result vector x to the state variables (var.result are views of x, no copies)
+        and stores all results in self.results (LPResults), e.g. self.results['Battery.E_el'] or self.results.timedep (steps x time dependent variables)
+        '''
+        from .lpResults import LPResults
         self.x = x
-        num_vars_timedep = len(self.stateVars_timedep)
+        self.results = LPResults.from_main(self,x)
         for var in self.stateVars_timedep:
-            var.result = x[:num_vars_timedep*self.inputdata.steps][var.pos::num_vars_timedep]
+            var.result = self.results.timedep[:,self.results.column(var.pos)]
         for var in self.stateVars_add:
             var.result = x[var.pos]
     
+    def __start_vector(self,warm_start):
+        '''Returns the start vector for the solver: None (cold start), the last result if warm_start is True or the passed vector'''
+        if warm_start is False or warm_start is None:
+            return None
+        if warm_start is True:
+            if self.x is None or len(self.x) != self.inputdata.num_vars:
+                return None
+            return np.asarray(self.x,dtype=float)
+        x0 = np.asarray(warm_start,dtype=float)
+        if x0.shape != (self.inputdata.num_vars,):
+            raise ValueError(f'The start vector must contain {self.inputdata.num_vars} values, got {x0.shape}')
+        return x0
+    
+    def __persistent_changes(self,solver:Solver):
+        '''
+        Compares the current model with the values transferred to the persistent solver model
+        Returns the indices of the changed values of f, lb, ub and beq or None, if the solver model has to be built again
+        '''
+        model = self.persistent_model
+        if model is None or model['solver'] != solver:
+            return None
+        Aeq = self.Aeq.tocoo()
+        if (model['shape'] != Aeq.shape or not np.array_equal(model['row'],Aeq.row) or not np.array_equal(model['col'],Aeq.col)
+                or not np.array_equal(model['data'],Aeq.data) or not np.array_equal(model['senses'],self.senses) or model['vtypes'] != list(self.vtypes)):
+            return None
+        return {key:np.flatnonzero(np.asarray(getattr(self,key)) != model[key]) for key in ('f','lb','ub','beq')}
+    
+    def __store_persistent_model(self,solver:Solver,**handles):
+        '''Keeps the solver model together with a copy of the transferred values, so later optimizations only have to transfer changes'''
+        Aeq = self.Aeq.tocoo()
+        self.persistent_model = dict(solver=solver,shape=Aeq.shape,row=Aeq.row.copy(),col=Aeq.col.copy(),data=Aeq.data.copy(),
+                                     senses=np.array(self.senses),vtypes=list(self.vtypes),**handles)
+        self.__update_persistent_values()
+    
+    def __update_persistent_values(self):
+        for key in ('f','lb','ub','beq'):
+            self.persistent_model[key] = np.array(getattr(self,key),dtype=float)
+    
 # %% Funktion Solver
-    def solver_gurobi(self,mipGab,objective):
+    def solver_gurobi(self,mipGab,objective,persistent=False,x0=None,threads=None,time_limit=None):
         '''
         The solver_gurobi function transfers the optimization model to the Gurobi solver, performs the optimization and returns the result.
         Aeq, beq, senses: Matrix or vector of equations with the comparison operator of each equation
         ctype, lb, ub: Type and upper and lower limits of the variables
         f: target function
+        persistent: keep the Gurobi model and only transfer changed values if it already exists
+        x0: optional start solution (MIP start)
+        threads: optional maximum number of threads
+        time_limit: optional time limit in seconds
         '''
-        # Transfer the optimization problem to the Gurobi API.
-        # Create an empty problem
-        problem = gp.Model()
-        if self.inputdata.verbose == False:
-            problem.setParam('LogToConsole',0)
-        # add variables
-        x = problem.addMVar(shape=self.inputdata.num_vars,lb=self.lb,ub=self.ub,vtype=self.vtypes)
-        # x = problem.addMVar(shape=self.inputdata.num_vars,lb=self.lb,ub=self.ub,vtype=['C' for _ in range(self.inputdata.num_vars)])
-        # Pass target function
-        
-        if objective == Obj.MINIMIZE:
-            problem.setObjective(self.f @ x, gp.GRB.MINIMIZE)    
+        import gurobipy as gp
+        changes = self.__persistent_changes(Solver.GUROBI) if persistent else None
+        if changes is None:
+            # Transfer the optimization problem to the Gurobi API.
+            # Create an empty problem
+            problem = gp.Model()
+            if self.inputdata.verbose == False:
+                problem.setParam('LogToConsole',0)
+            # add variables
+            x = problem.addMVar(shape=self.inputdata.num_vars,lb=self.lb,ub=self.ub,vtype=self.vtypes)
+            # Pass target function
+            
+            if objective == Obj.MINIMIZE:
+                problem.setObjective(self.f @ x, gp.GRB.MINIMIZE)    
+            else:
+                problem.setObjective(self.f @ x, gp.GRB.MAXIMIZE)    
+            # pass equations
+            constrs = problem.addMConstr(self.Aeq.tocsr(), x, self.senses, self.beq)
+            if persistent:
+                problem.update()
+                self.__store_persistent_model(Solver.GUROBI,problem=problem,x=x,var_lst=x.tolist(),constr_lst=constrs.tolist())
         else:
-            problem.setObjective(self.f @ x, gp.GRB.MAXIMIZE)    
-        # pass equations
-        problem.addMConstr(self.Aeq.tocsr(), x, self.senses, self.beq)
+            # only transfer the changed values to the existing model
+            problem,x = self.persistent_model['problem'],self.persistent_model['x']
+            var_lst,constr_lst = self.persistent_model['var_lst'],self.persistent_model['constr_lst']
+            for key,attr,objs in (('f','Obj',var_lst),('lb','LB',var_lst),('ub','UB',var_lst),('beq','RHS',constr_lst)):
+                idx = changes[key]
+                if len(idx) > 0:
+                    problem.setAttr(attr,[objs[i] for i in idx],np.asarray(getattr(self,key),dtype=float)[idx].tolist())
+            problem.ModelSense = gp.GRB.MINIMIZE if objective == Obj.MINIMIZE else gp.GRB.MAXIMIZE
+            self.__update_persistent_values()
+        if x0 is not None:
+            x.Start = x0
         # optimize problem
         problem.setParam('MIPGap', mipGab)  # Percentage distance to the optimum solution
-        problem.optimize()
+        if threads is not None:
+            problem.setParam('Threads', threads)
+        problem.setParam('TimeLimit', time_limit if time_limit is not None else gp.GRB.INFINITY)
+        with self.profiler.phase('solve'):
+            problem.optimize()
+        self.solver_status = next((name for name in dir(gp.GRB.Status) if getattr(gp.GRB.Status,name) == problem.Status),str(problem.Status))
+        self.solver_info.update(runtime_s=problem.Runtime,iterations=int(problem.IterCount))
+        if problem.IsMIP:
+            self.solver_info.update(nodes=int(problem.NodeCount),mip_gap=problem.MIPGap if problem.SolCount > 0 else None)
         x = x.X
         return x
     
-    def solver_scipy(self,mipGap,objective):
+    def solver_scipy(self,mipGap,objective,time_limit=None):
         '''
         The solver_scipy function transfers the optimization model to the scipy milp solver, performs the optimization and returns the result.
         Note: This solver is free but very slow
@@ -202,56 +634,155 @@ class LPMain:
         ctype, lb, ub: Type and upper and lower limits of the variables
         f: target function
         '''
-        if objective == Obj.MINIMIZE:
-            pass   
-        else:
-            raise Exception('The scipy-Solver only allows minimizing')  
-        b_l=[]
-        b_u=[]
-        for idx,sense in enumerate(self.senses):
-            if sense == 'E' or sense == '=':
-                b_l.append(self.beq[idx])
-                b_u.append(self.beq[idx])
-            elif sense == '<':
-                b_l.append(-np.inf)
-                b_u.append(self.beq[idx])
-            elif sense == '>':
-                b_l.append(self.beq[idx])
-                b_u.append(np.inf)
-            else:
-                raise Exception(f'Unknown Sense {sense}')
-        # vtypes / integrality
-        integrality=[]
-        for idx,vtype in enumerate(self.vtypes):
-            if vtype == 'C':
-                integrality.append(0)
-            elif vtype == 'I':
-                integrality.append(1)
-            elif vtype == 'S':
-                integrality.append(2)
-            elif vtype == 'N':
-                integrality.append(3)#
-            elif vtype == 'B':#
-                integrality.append(1)
-                self.lb[idx]=0
-                self.ub[idx]=1
-            else:
-                print('unknown vtype')
-        from scipy.optimize import LinearConstraint
+        from scipy.optimize import LinearConstraint, Bounds, milp
+        b_l,b_u = self.row_bounds()
+        integrality,lb,ub = self.integrality()
         constraints = LinearConstraint(self.Aeq,b_l,b_u)
-        # %%
-        from scipy.optimize import milp
-        res = milp(c=self.f,constraints=constraints,integrality=integrality,options={'mip_rel_gap':mipGap})
+        # milp only minimizes, a maximization is solved as minimization of -f
+        c = self.f if objective == Obj.MINIMIZE else -self.f
+        options = {'mip_rel_gap':mipGap}
+        if time_limit is not None:
+            options['time_limit'] = time_limit
+        with self.profiler.phase('solve') as record:
+            res = milp(c=c,constraints=constraints,integrality=integrality,bounds=Bounds(lb,ub),options=options)
+        self.solver_status = res.message
+        self.solver_info.update(runtime_s=record['time_s'],nodes=getattr(res,'mip_node_count',None),mip_gap=getattr(res,'mip_gap',None))
         return res.x
 
-    def solver_cplex(self,mipgap,objective):
+    def solver_highs(self,mipGap,objective,persistent=False,x0=None,threads=None,time_limit=None):
+        '''
+        The solver_highs function transfers the optimization model directly to the HiGHS solver (highspy), performs the optimization and returns the result.
+        Aeq, beq, senses: Matrix or vector of equations with the comparison operator of each equation
+        ctype, lb, ub: Type and upper and lower limits of the variables
+        f: target function
+        persistent: keep the HiGHS model and only transfer changed values if it already exists
+        x0: optional start solution
+        threads: optional maximum number of threads
+        time_limit: optional time limit in seconds
+        '''
+        import highspy
+        changes = self.__persistent_changes(Solver.HIGHS) if persistent else None
+        if changes is None:
+            problem = highspy.Highs()
+            problem.setOptionValue('output_flag',bool(self.inputdata.verbose))
+            b_l,b_u = self.row_bounds()
+            integrality,lb,ub = self.integrality()
+            Aeq = self.Aeq.tocsr()
+            lp = highspy.HighsLp()
+            lp.num_col_ = self.inputdata.num_vars
+            lp.num_row_ = Aeq.shape[0]
+            lp.col_cost_ = np.asarray(self.f,dtype=float)
+            lp.col_lower_ = lb
+            lp.col_upper_ = ub
+            lp.row_lower_ = b_l
+            lp.row_upper_ = b_u
+            lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+            lp.a_matrix_.start_ = Aeq.indptr
+            lp.a_matrix_.index_ = Aeq.indices
+            lp.a_matrix_.value_ = Aeq.data
+            if integrality.any():
+                lp.integrality_ = [highspy.HighsVarType(i) for i in integrality.tolist()]
+            problem.passModel(lp)
+            if persistent:
+                self.__store_persistent_model(Solver.HIGHS,problem=problem)
+        else:
+            # only transfer the changed values to the existing model
+            problem = self.persistent_model['problem']
+            idx = changes['f']
+            if len(idx) > 0:
+                problem.changeColsCost(len(idx),idx,np.asarray(self.f,dtype=float)[idx])
+            idx = np.union1d(changes['lb'],changes['ub'])
+            if len(idx) > 0:
+                _,lb,ub = self.integrality()
+                problem.changeColsBounds(len(idx),idx,lb[idx],ub[idx])
+            idx = changes['beq']
+            if len(idx) > 0:
+                b_l,b_u = self.row_bounds()
+                problem.changeRowsBounds(len(idx),idx,b_l[idx],b_u[idx])
+            self.__update_persistent_values()
+        problem.changeObjectiveSense(highspy.ObjSense.kMinimize if objective == Obj.MINIMIZE else highspy.ObjSense.kMaximize)
+        problem.setOptionValue('mip_rel_gap',float(mipGap))
+        if threads is not None:
+            problem.setOptionValue('threads',int(threads))
+        problem.setOptionValue('time_limit',float(time_limit) if time_limit is not None else float('inf'))
+        if x0 is not None:
+            solution = highspy.HighsSolution()
+            solution.col_value = x0.tolist()
+            problem.setSolution(solution)
+        run_time = problem.getRunTime()
+        with self.profiler.phase('solve'):
+            problem.run()
+        self.solver_status = problem.modelStatusToString(problem.getModelStatus())
+        info = problem.getInfo()
+        self.solver_info.update(runtime_s=problem.getRunTime()-run_time,iterations=info.simplex_iteration_count)
+        if info.mip_node_count >= 0:
+            self.solver_info.update(nodes=info.mip_node_count,mip_gap=info.mip_gap)
+        if problem.getInfo().primal_solution_status != 2: # 2 = feasible
+            raise Exception(f'HiGHS found no feasible solution: {self.solver_status}')
+        return np.array(problem.getSolution().col_value)
+    
+    def row_bounds(self):
+        '''Returns lower and upper limits of all equations (b_l <= Aeq*x <= b_u) based on beq and senses'''
+        beq = np.asarray(self.beq,dtype=float)
+        senses = np.asarray(self.senses)
+        unknown = ~np.isin(senses,['E','e','=','<','>'])
+        if unknown.any():
+            raise Exception(f'Unknown Sense {senses[unknown][0]}')
+        b_l = np.where(senses == '<',-np.inf,beq)
+        b_u = np.where(senses == '>',np.inf,beq)
+        return b_l,b_u
+    
+    def integrality(self):
+        '''
+        Returns the variable types as integrality array (0: continuous, 1: integer, 2: semi-continuous, 3: semi-integer) as used by scipy and HiGHS
+        together with lower and upper bounds, where the bounds of binary variables are limited to 0 and 1
+        '''
+        vtypes = np.asarray(self.vtypes)
+        integrality = np.select([vtypes == 'I',vtypes == 'B',vtypes == 'S',vtypes == 'N'],[1,1,2,3],0)
+        if not np.isin(vtypes,['C','I','B','S','N']).all():
+            print('unknown vtype')
+        binary = vtypes == 'B'
+        lb = np.where(binary,np.maximum(self.lb,0),self.lb).astype(float)
+        ub = np.where(binary,np.minimum(self.ub,1),self.ub).astype(float)
+        return integrality,lb,ub
+
+    def solver_cplex(self,mipgap,objective,persistent=False,x0=None,threads=None,time_limit=None):
         '''
         The solver_cplex() function transfers the optimization model to the cplex solver, performs the optimization and returns the result.
         Aeq, beq, senses: Matrix or vector of equations with the comparison operator of each equation
         ctype, lb, ub: Type and upper and lower limits of the variables
         f: target function
+        persistent: keep the cplex model and only transfer changed values if it already exists
+        x0: optional start solution (MIP start)
+        threads: optional maximum number of threads
+        time_limit: optional time limit in seconds
         '''
         import cplex
+        changes = self.__persistent_changes(Solver.CPLEX) if persistent else None
+        if changes is not None:
+            # only transfer the changed values to the existing model
+            problem = self.persistent_model['problem']
+            for key,setter in (('f',problem.objective.set_linear),('lb',problem.variables.set_lower_bounds),
+                               ('ub',problem.variables.set_upper_bounds),('beq',problem.linear_constraints.set_rhs)):
+                idx = changes[key]
+                if len(idx) > 0:
+                    setter(list(zip(idx.tolist(),np.asarray(getattr(self,key),dtype=float)[idx].tolist())))
+            if objective == Obj.MINIMIZE:
+                problem.objective.set_sense(problem.objective.sense.minimize)    
+            else:
+                problem.objective.set_sense(problem.objective.sense.maximize)    
+            problem.parameters.mip.tolerances.mipgap.set(float(mipgap))
+            if threads is not None:
+                problem.parameters.threads.set(threads)
+            if time_limit is not None:
+                problem.parameters.timelimit.set(time_limit)
+            else:
+                problem.parameters.timelimit.reset()
+            self.__update_persistent_values()
+            self.__cplex_mip_start(problem,x0)
+            self.__cplex_solve(problem)
+            return np.array(problem.solution.get_values())
+        
         # nbew empty problem
         problem = cplex.Cplex()
 
@@ -310,82 +841,299 @@ class LPMain:
             
         # setting mipgap
         problem.parameters.mip.tolerances.mipgap.set(float(mipgap))
+        if threads is not None:
+            problem.parameters.threads.set(threads)
+        if time_limit is not None:
+            problem.parameters.timelimit.set(time_limit)
 
         del Aeq_rows, Aeq_cols, Aeq_vals, beq_rows, beq_vals
+        if persistent:
+            self.__store_persistent_model(Solver.CPLEX,problem=problem)
 
+        self.__cplex_mip_start(problem,x0)
         # Solver
-        problem.solve()
-
+        self.__cplex_solve(problem)
         # Returning result vector
         x = np.array(problem.solution.get_values())
         return x
             
 
+    def __cplex_solve(self,problem):
+        '''Solves the cplex problem and stores status, runtime, iterations and for mixed integer problems nodes and gap'''
+        start = problem.get_time()
+        with self.profiler.phase('solve'):
+            problem.solve()
+        self.solver_status = problem.solution.get_status_string()
+        self.solver_info.update(runtime_s=problem.get_time()-start,iterations=problem.solution.progress.get_num_iterations())
+        if problem.get_problem_type() != problem.problem_type.LP:
+            self.solver_info.update(nodes=problem.solution.progress.get_num_nodes_processed(),mip_gap=problem.solution.MIP.get_mip_relative_gap())
+
+    def __cplex_mip_start(self,problem,x0):
+        '''Passes the start solution x0 to cplex as the only MIP start (start solutions are only used for mixed integer problems)'''
+        if problem.MIP_starts.get_num() > 0:
+            problem.MIP_starts.delete()
+        if x0 is not None and problem.get_problem_type() != problem.problem_type.LP:
+            problem.MIP_starts.add([list(range(len(x0))),x0.tolist()],problem.MIP_starts.effort_level.auto)
+
+    def var_labels(self)->dict:
+        '''
+        Returns a unique label 'object.variable' for every state variable, e.g. 'Battery.E_el'.
+        Objects without a name are labeled with their class name; if several objects have the same label, they are numbered (Battery, Battery_2, ...)
+        '''
+        labels = {}
+        obj_count = {}
+        for obj in self.obj_lst:
+            obj_label = obj.name if obj.name else type(obj).__name__
+            obj_count[obj_label] = obj_count.get(obj_label,0) + 1
+            if obj_count[obj_label] > 1:
+                obj_label = f'{obj_label}_{obj_count[obj_label]}'
+            for var in obj.stateVar_lst:
+                labels[var] = f'{obj_label}.{var.name}'
+        return labels
+    
+    def col_names(self)->np.ndarray:
+        '''Returns the names of all columns of Aeq: label of the variable and time step for time dependent variables (e.g. Battery.E_el_12), the label for additional variables'''
+        import re
+        names = np.empty(self.inputdata.num_vars,dtype=object)
+        steps = np.arange(self.inputdata.steps).astype(str).astype(object)
+        for var,label in self.var_labels().items():
+            label = re.sub(r'[^A-Za-z0-9_.]','_',label)
+            if isinstance(var,LPStateVar_timedep):
+                names[self.var_slice(var)] = self.__join_str(label+'_',steps)
+            else:
+                names[var.pos] = label
+        return names
+    
+    def write_mps(self,path,objective:Obj=Obj.MINIMIZE):
+        '''
+        Writes the equation system to an MPS file (free format), e.g. to pass the model to other solvers or to archive it.
+        The file is written directly from Aeq, beq, senses, lb, ub, vtypes and f without building a solver model.
+        Column names are the variable labels with time step (see col_names), rows are named c0, c1, ...
+        '''
+        Aeq = self.Aeq.tocsc()
+        names = self.col_names()
+        row_names = self.__join_str('c',np.arange(Aeq.shape[0]).astype(str))
+        senses = np.asarray(self.senses)
+        integrality,lb,ub = self.integrality()
+        vtypes = np.asarray(self.vtypes)
+        f = np.asarray(self.f,dtype=float)
+        
+        with open(path,'w',buffering=1<<20) as file:
+            file.write(f'NAME MilPython\nOBJSENSE\n    {"MIN" if objective == Obj.MINIMIZE else "MAX"}\nROWS\n N obj\n')
+            row_type = np.where(senses == '<','L',np.where(senses == '>','G','E'))
+            self.__write_lines(file,self.__join_str(' ',row_type,' ',row_names))
+            # COLUMNS: objective and matrix entries sorted by column, every column appears at least once
+            file.write('COLUMNS\n')
+            col_count = np.diff(Aeq.indptr)
+            obj_cols = np.flatnonzero((f != 0) | (col_count == 0))
+            cols = np.concatenate([obj_cols,np.repeat(np.arange(Aeq.shape[1]),col_count)])
+            rows = np.concatenate([np.full(len(obj_cols),'obj',dtype=object),row_names[Aeq.indices]])
+            values = np.concatenate([f[obj_cols],Aeq.data])
+            order = np.argsort(cols,kind='stable')
+            cols,rows,values = cols[order],rows[order],values[order]
+            lines = self.__join_str('    ',names[cols],' ',rows,' ',self.__num_str(values))
+            # integer columns are enclosed by markers
+            is_int = np.isin(vtypes[cols],['I','B','N'])
+            run_starts = np.flatnonzero(np.diff(np.concatenate([[False],is_int,[False]]).astype(int)))
+            markers = np.where(np.arange(len(run_starts)) % 2 == 0,"    MARKER 'MARKER' 'INTORG'","    MARKER 'MARKER' 'INTEND'")
+            self.__write_lines(file,np.insert(lines,run_starts,markers.astype(object)))
+            # RHS
+            file.write('RHS\n')
+            beq = np.asarray(self.beq,dtype=float)
+            idx = np.flatnonzero(beq != 0)
+            self.__write_lines(file,self.__join_str('    RHS ',row_names[idx],' ',self.__num_str(beq[idx])))
+            # BOUNDS
+            file.write('BOUNDS\n')
+            binary = (vtypes == 'B') & (lb == 0) & (ub == 1)
+            semi = np.isin(vtypes,['S','N'])
+            fixed = (lb == ub) & ~binary & ~semi
+            free = (lb == -np.inf) & (ub == np.inf) & ~semi
+            other = ~binary & ~fixed & ~free
+            bounds = [self.__join_str(' BV BND ',names[binary]),
+                      self.__join_str(' FX BND ',names[fixed],' ',self.__num_str(lb[fixed])),
+                      self.__join_str(' FR BND ',names[free])]
+            idx = other & (lb == -np.inf)
+            bounds.append(self.__join_str(' MI BND ',names[idx]))
+            idx = other & (lb != 0) & (lb != -np.inf)
+            bounds.append(self.__join_str(' LO BND ',names[idx],' ',self.__num_str(lb[idx])))
+            idx = other & ~semi & (ub != np.inf)
+            bounds.append(self.__join_str(' UP BND ',names[idx],' ',self.__num_str(ub[idx])))
+            bounds.append(self.__join_str(' SC BND ',names[semi],' ',self.__num_str(np.where(ub[semi] == np.inf,1e30,ub[semi]))))
+            for lines in bounds:
+                self.__write_lines(file,lines)
+            file.write('ENDATA\n')
+    
+    def write_lp(self,path,objective:Obj=Obj.MINIMIZE):
+        '''
+        Writes the equation system to an LP file (CPLEX LP format), e.g. to pass the model to other solvers or to read the equations of small models.
+        The file is written directly from Aeq, beq, senses, lb, ub, vtypes and f without building a solver model.
+        Column names are the variable labels with time step (see col_names), rows are named c0, c1, ...
+        '''
+        Aeq = self.Aeq.tocsr()
+        # empty rows get a zero entry of the first column so they are still written
+        row_count = np.diff(Aeq.indptr)
+        empty_rows = np.flatnonzero(row_count == 0)
+        rows = np.concatenate([np.repeat(np.arange(Aeq.shape[0]),row_count),empty_rows])
+        order = np.argsort(rows,kind='stable')
+        cols = np.concatenate([Aeq.indices,np.zeros(len(empty_rows),dtype=Aeq.indices.dtype)])[order]
+        values = np.concatenate([Aeq.data,np.zeros(len(empty_rows))])[order]
+        ends = np.cumsum(np.maximum(row_count,1)) - 1
+        starts = np.concatenate([[0],ends[:-1]+1]).astype(int)
+        names = self.col_names()
+        senses = np.asarray(self.senses)
+        integrality,lb,ub = self.integrality()
+        vtypes = np.asarray(self.vtypes)
+        f = np.asarray(self.f,dtype=float)
+        
+        with open(path,'w',buffering=1<<20) as file:
+            file.write('\\ written by MilPython\n')
+            file.write('Minimize\n' if objective == Obj.MINIMIZE else 'Maximize\n')
+            idx = np.flatnonzero(f)
+            file.write(' obj:')
+            if len(idx) > 0:
+                file.write('\n   '.join([''] + self.__lp_terms(f[idx],names[idx]).tolist()))
+            else:
+                file.write(' 0 ' + names[0])
+            file.write('\nSubject To\n')
+            # each term on its own line, the row name is put in front of the first term, sense and right side after the last term
+            terms = self.__join_str('   ',self.__lp_terms(values,names[cols]))
+            terms[starts] = self.__join_str(' c',np.arange(Aeq.shape[0]).astype(str),':\n',terms[starts])
+            sense = np.where(senses == '<',' <= ',np.where(senses == '>',' >= ',' = '))
+            terms[ends] = self.__join_str(terms[ends],sense,self.__num_str(np.asarray(self.beq,dtype=float)))
+            self.__write_lines(file,terms)
+            # bounds (binary variables with bounds 0 and 1 and variables with default bounds 0 and inf are not written)
+            file.write('Bounds\n')
+            binary = (vtypes == 'B') & (lb == 0) & (ub == 1)
+            default = (lb == 0) & (ub == np.inf)
+            fixed = (lb == ub) & ~binary
+            free = (lb == -np.inf) & (ub == np.inf)
+            other = ~binary & ~default & ~fixed & ~free
+            self.__write_lines(file,self.__join_str(' ',names[fixed],' = ',self.__num_str(lb[fixed])))
+            self.__write_lines(file,self.__join_str(' ',names[free],' free'))
+            self.__write_lines(file,self.__join_str(' ',self.__num_str(lb[other]),' <= ',names[other],' <= ',self.__num_str(ub[other])))
+            for section,mask in (('General',np.isin(vtypes,['I','N'])|((vtypes == 'B') & ~binary)),('Binary',binary),('Semi-Continuous',np.isin(vtypes,['S','N']))):
+                if mask.any():
+                    file.write(section+'\n')
+                    self.__write_lines(file,self.__join_str(' ',names[mask]))
+            file.write('End\n')
+    
+    def __lp_terms(self,values,names):
+        '''Formats the terms "+ value name" of an LP file'''
+        return self.__join_str(np.where(values < 0,'- ','+ '),self.__num_str(np.abs(values)),' ',names)
+    
+    def __num_str(self,values):
+        '''Formats numbers as strings; only the unique values are formatted, as coefficient arrays usually contain few different values'''
+        unique,inverse = np.unique(values,return_inverse=True)
+        return unique.astype(str).astype(object)[inverse]
+    
+    def __join_str(self,*parts):
+        '''Elementwise concatenation of string arrays (and single strings), returns an object array'''
+        from itertools import repeat
+        length = next(len(part) for part in parts if not isinstance(part,str))
+        parts = [repeat(part,length) if isinstance(part,str) else np.asarray(part).tolist() for part in parts]
+        return np.array(list(map(''.join,zip(*parts))),dtype=object)
+    
+    def __write_lines(self,file,lines,chunk_size=100000):
+        '''Writes an array of lines to the file in chunks'''
+        for start in range(0,len(lines),chunk_size):
+            file.write('\n'.join(lines[start:start+chunk_size].tolist()))
+            file.write('\n')
+    
+    def results_to_parquet(self,path:str):
+        '''Exports the results of the time dependent variables to a Parquet file in one go (one column per variable 'object.variable', see LPResults.to_table)'''
+        if self.results is None:
+            print('The optimization must be performed first')
+            return
+        self.results.to_parquet(path)
+
+    def results_to_feather(self,path:str):
+        '''Exports the results of the time dependent variables to a Feather file in one go (one column per variable 'object.variable', see LPResults.to_table)'''
+        if self.results is None:
+            print('The optimization must be performed first')
+            return
+        self.results.to_feather(path)
+
+    def results_to_csv(self,path:str):
+        '''Exports the results of the time dependent variables to a CSV file in one go, the metadata and additional variables to path + '.json' '''
+        if self.results is None:
+            print('The optimization must be performed first')
+            return
+        self.results.to_csv(path)
+        
     def results_to_excel(self,path):
         '''
         Exports the results of the LP model to an Excel file. 
         Iterates through each object in 'obj_lst', extracts state variables and their results, 
         and writes them to separate sheets in an Excel file.
+        Each sheet is built in one step and the column widths are computed from the data in memory. With xlsxwriter installed the file is written
+        row by row in its constant memory mode, otherwise openpyxl is used.
 
         Parameters:
         path (str): The file path where the Excel file should be saved.
         '''
         if not path.endswith('.xlsx'):
             path+='.xlsx'
-        import pandas as pd
-        with pd.ExcelWriter(path,engine='openpyxl') as writer:
-            for obj in self.obj_lst:
-                if obj.name=='':
-                    name=type(obj).__name__
-                else:
-                    name = obj.name
-                df = pd.DataFrame(columns=['Name','Unit','Type','Min','Max','Timedependet'])
-                # df.columns = ['Name','Unit','Type','Min','Max','Timedependet']
-                for var in obj.stateVar_lst:
-                    td = type(var) == LPStateVar_timedep
-                    df = pd.concat([df,pd.DataFrame.from_records([{'Name':var.name,'Unit':var.unit,'Type':var.vtype,'Min':var.lb,'Max':var.ub,'Timedependet':td}])])
-                if len(df)>0:
-                    df.to_excel(writer,sheet_name=f'{name} - Variables',index=False)
-                # Result of timedependent variables
-                df = pd.DataFrame()
-                df['t']=range(self.inputdata.steps)
-                for var in obj.stateVar_lst:
-                    df[var.name]=var.result
-                if df.shape[1]>1:
-                    df.to_excel(writer,sheet_name=f'{name} - Results',index=False)
-        self.__optimize_excel_col_width(path)
+        sheets = []
+        for obj in self.obj_lst:
+            if obj.name=='':
+                name=type(obj).__name__
+            else:
+                name = obj.name
+            if not obj.stateVar_lst:
+                continue
+            rows = [[var.name,var.unit,var.vtype,self.__excel_value(var.lb),self.__excel_value(var.ub),isinstance(var,LPStateVar_timedep)] for var in obj.stateVar_lst]
+            sheets.append((f'{name} - Variables',['Name','Unit','Type','Min','Max','Timedependet'],rows))
+            # Result of timedependent variables (additional variables are repeated in every row)
+            if self.x is not None:
+                values = np.empty((self.inputdata.steps,len(obj.stateVar_lst)))
+                for idx,var in enumerate(obj.stateVar_lst):
+                    values[:,idx] = var.result
+                # the time step is written as integer
+                rows = [[t]+row for t,row in enumerate(values.tolist())]
+                sheets.append((f'{name} - Results',['t']+[var.name for var in obj.stateVar_lst],rows))
+        try:
+            import xlsxwriter
+        except ImportError:
+            xlsxwriter = None
+        if xlsxwriter is not None:
+            with xlsxwriter.Workbook(path,{'constant_memory':True}) as wb:
+                for sheet_name,header,rows in sheets:
+                    ws = wb.add_worksheet(sheet_name)
+                    for col_idx,width in enumerate(self.__excel_col_widths(header,rows)):
+                        ws.set_column(col_idx,col_idx,width)
+                    ws.write_row(0,0,header)
+                    for row_idx,row in enumerate(rows,start=1):
+                        ws.write_row(row_idx,0,row)
+        else:
+            from openpyxl import Workbook
+            from openpyxl.utils import get_column_letter
+            wb = Workbook(write_only=True)
+            for sheet_name,header,rows in sheets:
+                ws = wb.create_sheet(sheet_name)
+                for col_idx,width in enumerate(self.__excel_col_widths(header,rows),start=1):
+                    ws.column_dimensions[get_column_letter(col_idx)].width = width
+                ws.append(header)
+                for row in rows:
+                    ws.append(row)
+            wb.save(path)
         
-    def __optimize_excel_col_width(self,path):
+    def __excel_value(self,value):
+        '''Bounds for the Excel export: inf as text, arrays (time dependent bounds) as range min..max'''
+        if np.ndim(value) > 0:
+            return f'{np.min(value)}..{np.max(value)}'
+        if np.isinf(value):
+            return str(value)
+        return value
+    
+    def __excel_col_widths(self,header,rows):
         '''
         optimizes the width of the excel columns so the full title of each column can be read
+        The widths are computed from the data in memory before writing (length of the longest value plus buffer)
         '''
-        from openpyxl import load_workbook
-        wb = load_workbook(path)
-        ws = wb.active
-
-        # Funktion zum Berechnen der optimalen Breite für jede Spalte
-        def get_optimal_width(column_values):
-            max_length = 0
-            for value in column_values:
-                max_length = max(max_length, len(str(value)))
-            return max_length + 2  # Zusätzlicher Platz für Puffer
-
-        # Schleife durch jede Spalte im DataFrame
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            
-            # Spalten als Liste holen
-            columns = list(ws.iter_rows(min_row=1, max_row=1, values_only=True))[0]
-
-            # Schleife durch jede Spalte im aktuellen Blatt
-            for col_idx, column in enumerate(columns, start=1):  # Spaltenindex beginnt bei 1 in Excel
-                col_letter = ws.cell(row=1, column=col_idx).column_letter  # Spaltenbuchstabe
-                column_values = [cell.value for cell in ws[col_letter]]  # Alle Werte der Spalte
-                optimal_width = get_optimal_width(column_values)
-                ws.column_dimensions[col_letter].width = optimal_width
-
-        # Speichern der angepassten Excel-Datei
-        wb.save(path)
+        widths = [len(str(title)) for title in header]
+        for col_idx,column in enumerate(zip(*rows)):
+            widths[col_idx] = max(widths[col_idx],max(map(len,map(str,column))))
+        return [width + 2 for width in widths]  # Zusätzlicher Platz für Puffer
 
     def show_lp_system(self,window_size="1225x850",width=500):
         '''
@@ -394,6 +1142,11 @@ class LPMain:
         There is no auto formatting yet. This function is still in an early state.
         If the equation is to wide for hte window, increase the width
         '''
+        import tkinter as tk
+        from tkinter import font as tkfont
+        from tkinter import ttk
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from .lpDisplay import ScrollableFrame
         root = tk.Tk()
         root.title("MILP System")
         root.geometry(window_size)  # Feste Fenstergröße einstellen
@@ -423,12 +1176,10 @@ class LPMain:
                 tree.heading('Timedep', text='Timedependent')
                 tree.pack(fill=tk.BOTH, expand=True)
 
-                for var in obj.stateVar_lst:
-                    var.timedep = isinstance(var, LPStateVar_timedep)
-
-                sorted_state_vars = sorted(obj.stateVar_lst, key=lambda x: (x.timedep, x.name))
+                sorted_state_vars = sorted(obj.stateVar_lst, key=lambda x: (isinstance(x, LPStateVar_timedep), x.name))
                 for var in sorted_state_vars:
-                    tree.insert("", "end", values=(var.name, var.unit, var.vtype, var.lb, var.ub, var.timedep))
+                    lb,ub = [bound if np.ndim(bound) == 0 else f'{np.min(bound)}..{np.max(bound)}' for bound in (var.lb,var.ub)]
+                    tree.insert("", "end", values=(var.name, var.unit, var.vtype, lb, ub, isinstance(var, LPStateVar_timedep)))
             else:
                 label = ttk.Label(frame, text="No State Variables", anchor="center", font=heading_font)
                 label.pack(padx=width,pady=10, fill=tk.BOTH)
@@ -480,6 +1231,8 @@ class LPMain:
         return ', '.join(output)
     
     def __create_figure_for_display(self,eq):
+        import matplotlib.pyplot as plt
+        import sympy as sp
         fig, ax = plt.subplots(figsize=(1.5,  0.5))  # Anpassen der Höhe an die Anzahl der Gleichungen #!anpassen
         ax.axis('off')
 
@@ -489,6 +1242,7 @@ class LPMain:
         return fig
 
     def __convert_to_sympy_equation(self,equation):
+        import sympy as sp
         # Initialize the left-hand side as 0
         lhs = 0
         first_timeindex=None
@@ -509,7 +1263,7 @@ class LPMain:
                 # Create the variable with time index
                 var_sympy = sp.Symbol(self.format_string(f"{var.name}_{{{t_step}}}"))
             else:
-                var.name, factor = var_info
+                var, factor = var_info
                 # Create the variable without time index
                 var_sympy = sp.Symbol(self.format_string(var.name))
             
@@ -533,58 +1287,42 @@ class LPMain:
             return sp.GreaterThan(lhs, rhs)
         else:
             raise ValueError("Unknown sense symbol. Use 'e' for equals, '<' for less than or equal, or '>' for greater than or equal.")
-class ScrollableFrame(ttk.Frame):
-    def __init__(self, container, *args, **kwargs):
-        super().__init__(container, *args, **kwargs)
-
-        self.canvas = tk.Canvas(self)
-        self.scrollable_frame = ttk.Frame(self.canvas)
-
-        # Vertikaler Scrollbar
-        v_scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
-        # Horizontaler Scrollbar
-        h_scrollbar = ttk.Scrollbar(self, orient="horizontal", command=self.canvas.xview)
-
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(
-                scrollregion=self.canvas.bbox("all")
-            )
-        )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-
-        self.canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-        self.canvas.pack(side="left", fill="both", expand=True)
-        v_scrollbar.pack(side="right", fill="y")
-        h_scrollbar.pack(side="bottom", fill="x")
-
-        self.bind("<Configure>", self.on_frame_configure)
 
-        # Bind mouse wheel events for scrolling on the canvas only
-        self.bind_mousewheel_events()
 
-    def on_frame_configure(self, event):
-        self.canvas.configure(width=event.width, height=event.height)
-        self.canvas.configure(scrollregion=self.canvas.bbox('all'))
-
-    def bind_mousewheel_events(self):
-        self.canvas.bind("<Enter>", self._bind_to_mousewheel)
-        self.canvas.bind("<Leave>", self._unbind_mousewheel)
-
-    def _on_mousewheel(self, event):
-        self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-
-    def _on_shift_mousewheel(self, event):
-        self.canvas.xview_scroll(int(-1 * (event.delta / 120)), "units")
+class _LPSnapshot(LPMain):
+    '''
+    Copy of the assembled equation system (Aeq, beq, senses, lb, ub, vtypes, f) of an LPMain object without its LPObjects.
+    It can be pickled cheaply and optimized in other processes
+    If system is given (an object with the attributes Aeq, beq, senses, lb, ub, vtypes and f, e.g. a reduced system of LPPresolve), its arrays are used
+    without copying instead of the ones of main
+    '''
+    def __init__(self,main:LPMain,system=None):
+        import copy
+        self.inputdata = copy.copy(main.inputdata)
+        self.inputdata.data = {}
+        if system is None:
+            self.Aeq = main.Aeq.copy()
+            self.beq = np.array(main.beq,dtype=float)
+            self.senses = np.array(main.senses)
+            self.lb = np.array(main.lb,dtype=float)
+            self.ub = np.array(main.ub,dtype=float)
+            self.vtypes = list(main.vtypes)
+            self.f = np.array(main.f,dtype=float)
+        else:
+            for key in ('Aeq','beq','senses','lb','ub','vtypes','f'):
+                setattr(self,key,getattr(system,key))
+            self.inputdata.num_vars = len(self.f)
+        self.obj_lst = []
+        self.stateVars,self.stateVars_timedep,self.stateVars_add = [],[],[]
+        self.persistent_model = None
+        self.x = None
+        self.results = None
+        self.solver_status = None
+        self.solver_info = {}
+        self.profiler = LPProfiler()
 
-    def _bind_to_mousewheel(self, event):
-        self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
-        self.canvas.bind_all("<Shift-MouseWheel>", self._on_shift_mousewheel)
 
-    def _unbind_mousewheel(self, event):
-        self.canvas.unbind_all("<MouseWheel>")
-        self.canvas.unbind_all("<Shift-MouseWheel>")
-    
-    
\ No newline at end of file
+def _optimize_snapshot(snapshot:_LPSnapshot,kwargs:dict):
+    '''Optimizes a snapshot in a worker process and returns the result vector'''
+    snapshot.optimize(**kwargs)
+    return snapshot.x
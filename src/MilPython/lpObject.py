@@ -1,10 +1,8 @@
 import numpy as np
 from .lpStateVar import LPStateVar, LPStateVar_timedep,LPStateVar_add
 from .lpInputdata import LPInputdata
-from scipy.sparse import coo_matrix, csc_matrix
-from .equation import Equation as Eq
+from .equation import EquationBlock, EquationStore, EquationList
 from collections import defaultdict
-import sympy as sp
 
 class LPObject:
     def __init__(self,inputdata:LPInputdata,name:str,comment:str):
@@ -15,7 +13,8 @@ class LPObject:
         self.name = name
         self.comment = comment
         self.stateVar_lst:list[LPStateVar]=[]
-        self.eq_lst=[]
+        self.eq_store=EquationStore()
+        self.eq_blocks:list[EquationBlock]=[]
 
     def add_time_var(self,name:str,unit:str='',lb:float=0,ub:float=np.inf,vtype='C',comment:str='')->LPStateVar_timedep:
         """adds a new timedependent statevariable to the LPObject; returns the statvar-object, which should be saved as a variable in the LPObject
@@ -23,8 +22,8 @@ class LPObject:
         Args:
             name (str): name of variable
             unit (str, optional): store variable unit here. Defaults to ''.
-            lb (float, optional): lowest allowed value for var. Defaults to 0.
-            ub (float, optional): highest allowed value for var. Defaults to np.inf.
+            lb (float or array, optional): lowest allowed value for var, single value or array with one value per time step (e.g. availability of PV). Defaults to 0.
+            ub (float or array, optional): highest allowed value for var, single value or array with one value per time step (e.g. plug-in times of an EV). Defaults to np.inf.
             comment (str, optional): optional space for comment, store sign convention here. Defaults to ''.
 
         Returns:
@@ -52,7 +51,7 @@ class LPObject:
         return var
     
     def add_eq(self,var_lst,sense='E',b=0,description=''):
-        """Adds an equation to the equation system; automatically adds eq to eq_lst of this object
+        """Adds an equation to the equation system; automatically adds eq to the equation store of this object
 
         Args:
             var_lst (list): each items of the list represents one variable in equation, format of each item (time dependent): [stateVar,factor,timestep]; for additional variables: [stateVar,factor] 
@@ -60,7 +59,27 @@ class LPObject:
             b (float): right side of equation
             description (str): optiional short description of equation
         """        
-        self.eq_lst.append(Eq(var_lst,sense,b,description))
+        self.eq_store.add(var_lst,sense,b,description)
+    
+    def add_eq_block(self,var_lst,sense='E',b=0,steps=None,boundary='skip',initial=None,final=None,description=''):
+        """Adds an equation for a whole range of time steps with one call; the equation is the same in every step, only factors and right side may vary per step.
+        Replaces loops over add_eq for large models, as the matrix entries of all steps are created at once.
+        Variables can be taken from other time steps relative to the step t with an offset, e.g. a storage balance E[t] - E[t-1] - P[t]*dt = 0:
+        add_eq_block([[E,1],[E,-1,-1],[P,-dt]],boundary='fixed',initial={E:E_0})
+
+        Args:
+            var_lst (list): each item of the list represents one variable in equation, format of each item: [stateVar,factor] or [stateVar,factor,offset]; time dependent variables are taken from step t+offset, additional variables are the same in every step. The factor can be a single value or an array with one value per step
+            sense (str): ">","=" or "<"
+            b (float or array): right side of equation, single value or an array with one value per step
+            steps (iterable, optional): time steps for which the equation is defined. Defaults to all time steps.
+            boundary (str, optional): handling of offsets outside the time horizon (first and last steps). 'skip': no equation for these steps; 'cyclic': periodic wraparound; 'fixed': values from initial/final are used and moved to the right side; 'periodic': wraparound within each typical period of an aggregated time series (see LPInputdata.aggregate), e.g. for a cyclic storage in every period. Defaults to 'skip'.
+            initial (dict, optional): {stateVar:value} for steps before the first step (boundary='fixed'). Missing variables take stateVar.initial (0 if not set).
+            final (dict, optional): {stateVar:value} for steps after the last step (boundary='fixed'). Missing variables are 0.
+            description (str): optional short description of equation
+        """
+        if steps is None:
+            steps = np.arange(self.inputdata.steps)
+        self.eq_blocks.append(EquationBlock(var_lst,sense,b,steps,description,boundary,initial,final,self.inputdata.period_steps))
     
     def getStateVars(self)->list[LPStateVar]:
         '''greturns list of state_vars'''
@@ -70,45 +89,65 @@ class LPObject:
         '''Has to be overritten by inheriting class'''
         pass
     
+    @property
+    def eq_lst(self)->EquationList:
+        '''
+        Equations added with add_eq as Equation-objects (created on demand from the equation store). Can be used like a list:
+        eq_lst.append(eq) adds eq to the equation store, eq_lst = [...] replaces all equations
+        '''
+        return EquationList(self.eq_store)
+
+    @eq_lst.setter
+    def eq_lst(self,eqs:list):
+        eqs = list(eqs)
+        self.eq_store.clear()
+        EquationList(self.eq_store).extend(eqs)
+
+    def return_triplets(self):
+        '''Changes format of local equations to row, col and data arrays (rows numbered starting at zero), right sides and senses, so lpmain can assemble all objects at once'''
+        stride = self.inputdata.stride
+        row,col,data,beq = self.eq_store.return_coo(stride)
+        senses = list(self.eq_store.senses)
+        if self.eq_blocks:
+            row_lst,col_lst,data_lst,beq_lst = [row],[col],[data],[beq]
+            eq_nr = len(beq)
+            for block in self.eq_blocks:
+                row,col,data,b = block.return_coo(stride,self.inputdata.steps)
+                row_lst.append(row + eq_nr)
+                col_lst.append(col)
+                data_lst.append(data)
+                beq_lst.append(b)
+                senses.extend([block.sense]*len(b))
+                eq_nr+=len(b)
+            row = np.concatenate(row_lst)
+            col = np.concatenate(col_lst)
+            data = np.concatenate(data_lst)
+            beq = np.concatenate(beq_lst)
+        return row,col,data,beq,senses
+    
     def return_eqs(self):
         '''Changes format of local equations so lpmain can take them'''
-        num_vars = sum(len(eq.var_lst) for eq in self.eq_lst)
-        self.idx=0
-        self.eq_nr=0
-        self.row = np.zeros(shape=(num_vars,))
-        self.col = np.zeros(shape=(num_vars,))
-        self.data = np.zeros(shape=(num_vars,))
-        self.senses=[]
-        self.beq = []
-        
-        for eq in self.eq_lst:
-            for var in eq.var_lst: 
-                if len(var) == 2:
-                    var.append(0)
-                self.row[self.idx] = self.eq_nr
-                self.col[self.idx] = var[0].pos + var[2] * self.inputdata.num_vars_timedep
-                self.data[self.idx] = var[1]
-                self.idx+=1
-            self.senses.append(eq.sense)
-            self.beq.append(eq.b)
-            self.eq_nr+=1
-        Aeq_temp = coo_matrix((self.data,(self.row,self.col)),shape=(self.eq_nr,self.inputdata.num_vars))
-        return Aeq_temp,self.beq,self.senses   
+        from scipy.sparse import coo_matrix
+        row,col,data,beq,senses = self.return_triplets()
+        Aeq_temp = coo_matrix((data,(row,col)),shape=(len(beq),self.inputdata.num_vars))
+        return Aeq_temp,beq,senses   
      
     
     def str_equation(self,equation):
-        min_time_step = min(time_step for _, _, time_step in equation.var_lst)
+        min_time_step = min((var_info[2] for var_info in equation.var_lst if len(var_info) == 3),default=0)
         sorted_var_lst = sorted(equation.var_lst, key=lambda x: x[0].name)  # sort by variable name
-        str_lst = [f"{var_state.name},{str(var_coef)},{str(time_step - min_time_step)}" for var_state, var_coef, time_step in sorted_var_lst]
+        str_lst = [f"{var_info[0].name},{str(var_info[1])},{str(var_info[2] - min_time_step) if len(var_info) == 3 else ''}" for var_info in sorted_var_lst]
         return ','.join(str_lst) + equation.sense + str(equation.b)
 
 
     def return_grouped_eqs(self):
         grouped = defaultdict(list)
-        for eqn in self.eq_lst:
+        for eqn in self.eq_store:
             key = self.str_equation(eqn)
             grouped[key].append(eqn)
         grouped_lst = list(grouped.values())
+        for block in self.eq_blocks:
+            grouped_lst.append(block.equations(self.inputdata.steps))
         return grouped_lst
     
     def round_scientific(self,number):
@@ -0,0 +1,228 @@
+import time
+import numpy as np
+from .tools import Obj
+
+class LPPresolve:
+    '''
+    Reduction of the equation system (Aeq, beq, senses, lb, ub, vtypes, f) of an LPMain object before it is passed to the solver.
+    The following reductions are repeated until nothing changes anymore:
+    - variables with lb == ub are fixed and moved to the right side
+    - empty equations are checked and removed
+    - equations with a single variable are converted to bounds of the variable (not for semi-continuous variables)
+    - variables that do not occur in any equation are set to their optimal bound
+    Afterwards equations that are duplicates of other equations (also multiplied by a factor) are removed.
+    All operations work on the sparse matrix as a whole. col_map and x_fixed are the postsolve mapping: postsolve creates the full result vector
+    from the result of the reduced system. What was removed is stored in report.
+    '''
+    def __init__(self,main,objective:Obj=Obj.MINIMIZE,tol:float=1e-9,max_passes:int=20):
+        """
+        Args:
+            main (LPMain): model with assembled equation system
+            objective (Obj, optional): direction of the optimization, needed to set unused variables to their optimal bound. Defaults to Obj.MINIMIZE.
+            tol (float, optional): tolerance for comparing values. Defaults to 1e-9.
+            max_passes (int, optional): maximum number of passes over the equation system. Defaults to 20.
+        """
+        from scipy.sparse import csr_matrix
+        start = time.perf_counter()
+        self.tol = tol
+        A = csr_matrix(main.Aeq)
+        A.sum_duplicates()
+        A.eliminate_zeros()
+        self.__A = A
+        self.__b = np.array(main.beq,dtype=float)
+        self.__senses = np.asarray(main.senses).astype('<U1')
+        self.__senses[np.isin(self.__senses,['E','e'])] = '='
+        self.__vtypes = np.asarray(main.vtypes).astype('<U1')
+        self.__lb = np.array(main.lb,dtype=float)
+        self.__ub = np.array(main.ub,dtype=float)
+        binary = self.__vtypes == 'B'
+        self.__lb[binary] = np.maximum(self.__lb[binary],0)
+        self.__ub[binary] = np.minimum(self.__ub[binary],1)
+        self.__f = np.array(main.f,dtype=float)
+        self.__c = self.__f if objective == Obj.MINIMIZE else -self.__f
+        self.__integer = np.isin(self.__vtypes,['I','B'])
+        self.__semi = np.isin(self.__vtypes,['S','N'])
+        num_rows,num_vars = A.shape
+        self.__rows = np.ones(num_rows,dtype=bool)
+        self.__cols = np.ones(num_vars,dtype=bool)
+        self.x_fixed = np.full(num_vars,np.nan)
+        self.report = {'rows_before':num_rows,'cols_before':num_vars,'nnz_before':int(A.nnz),'fixed_vars':0,'singleton_rows':0,
+                       'empty_rows':0,'empty_cols':0,'duplicate_rows':0,'passes':0,'objective_offset':0.0}
+        self.__reduce(max_passes)
+        self.__build_reduced()
+        self.report['time_s'] = time.perf_counter() - start
+
+    def __reduce(self,max_passes):
+        ones = self.__A.copy()
+        ones.data[:] = 1
+        self.__ones = ones
+        for _ in range(max_passes):
+            self.report['passes'] += 1
+            changed = self.__fix_vars()
+            changed |= self.__remove_empty_rows()
+            changed |= self.__singleton_rows()
+            changed |= self.__empty_cols()
+            if not changed:
+                break
+        self.__duplicate_rows()
+
+    def __fix(self,cols,values):
+        '''Fixes the variables cols to values and moves them to the right side'''
+        self.x_fixed[cols] = values
+        self.__cols[cols] = False
+        self.__b -= self.__A[:,cols] @ values
+        self.report['objective_offset'] += float(self.__f[cols] @ values)
+
+    def __fix_vars(self):
+        '''Variables with lb == ub (semi-continuous variables only if both are zero)'''
+        fixed = self.__cols & (self.__ub - self.__lb <= self.tol)
+        fixed &= ~self.__semi | ((np.abs(self.__lb) <= self.tol) & (np.abs(self.__ub) <= self.tol))
+        cols = np.flatnonzero(fixed)
+        if len(cols) == 0:
+            return False
+        values = np.where(self.__integer[cols],np.round(self.__lb[cols]),self.__lb[cols])
+        self.__fix(cols,values)
+        self.report['fixed_vars'] += len(cols)
+        return True
+
+    def __row_counts(self):
+        return self.__ones @ self.__cols.astype(float)
+
+    def __remove_empty_rows(self):
+        '''Empty equations (all variables removed) are checked for feasibility and removed'''
+        empty = self.__rows & (self.__row_counts() == 0)
+        rows = np.flatnonzero(empty)
+        if len(rows) == 0:
+            return False
+        b,senses = self.__b[rows],self.__senses[rows]
+        violated = ((senses == '=') & (np.abs(b) > self.tol)) | ((senses == '<') & (b < -self.tol)) | ((senses == '>') & (b > self.tol))
+        if violated.any():
+            raise Exception(f'Presolve: the equation system is infeasible (equation {rows[violated][0]}: 0 {senses[violated][0]} {b[violated][0]})')
+        self.__rows[rows] = False
+        self.report['empty_rows'] += len(rows)
+        return True
+
+    def __singleton_rows(self):
+        '''Equations with a single (not semi-continuous) variable are converted to bounds'''
+        rows = np.flatnonzero(self.__rows & (self.__row_counts() == 1))
+        if len(rows) == 0:
+            return False
+        sub = self.__A[rows].multiply(self.__cols.astype(float)).tocsr()
+        sub.eliminate_zeros()
+        cols,a = sub.indices,sub.data
+        keep = ~self.__semi[cols]
+        rows,cols,a = rows[keep],cols[keep],a[keep]
+        if len(rows) == 0:
+            return False
+        bound = self.__b[rows] / a
+        senses = self.__senses[rows]
+        upper = (senses == '=') | ((senses == '<') & (a > 0)) | ((senses == '>') & (a < 0))
+        lower = (senses == '=') | ((senses == '>') & (a > 0)) | ((senses == '<') & (a < 0))
+        np.minimum.at(self.__ub,cols[upper],bound[upper])
+        np.maximum.at(self.__lb,cols[lower],bound[lower])
+        integer = self.__integer
+        self.__lb[integer] = np.ceil(self.__lb[integer] - self.tol)
+        self.__ub[integer] = np.floor(self.__ub[integer] + self.tol)
+        infeasible = self.__lb[cols] > self.__ub[cols] + self.tol
+        if infeasible.any():
+            raise Exception(f'Presolve: the equation system is infeasible (bounds of variable {cols[infeasible][0]} contradict each other)')
+        self.__ub[cols] = np.maximum(self.__ub[cols],self.__lb[cols])
+        self.__rows[rows] = False
+        self.report['singleton_rows'] += len(rows)
+        return True
+
+    def __empty_cols(self):
+        '''Variables that do not occur in any remaining equation are set to the bound that is optimal for the target function'''
+        col_counts = self.__ones.T @ self.__rows.astype(float)
+        cols = np.flatnonzero(self.__cols & (col_counts == 0))
+        if len(cols) == 0:
+            return False
+        c,lb,ub = self.__c[cols],self.__lb[cols],self.__ub[cols]
+        values = np.where(c > 0,lb,np.where(c < 0,ub,np.clip(0,lb,ub)))
+        semi = self.__semi[cols]
+        values[semi] = np.where(c[semi] < 0,ub[semi],0)
+        values[self.__integer[cols]] = np.ceil(values[self.__integer[cols]] - self.tol)
+        keep = np.isfinite(values) & (~semi | (lb >= 0))
+        if not keep.any():
+            return False
+        self.__fix(cols[keep],values[keep])
+        self.report['empty_cols'] += int(keep.sum())
+        return True
+
+    def __duplicate_rows(self):
+        '''
+        Removes equations that are duplicates of other equations (after dividing by their first coefficient); of equal inequalities the tightest one is kept.
+        Candidates are found with two random projections of the normalized rows and checked exactly
+        '''
+        rows = np.flatnonzero(self.__rows)
+        if len(rows) < 2:
+            return
+        A = self.__A[rows][:,np.flatnonzero(self.__cols)].tocsr()
+        A.sort_indices()
+        nnz = np.diff(A.indptr)
+        first = np.where(nnz > 0,A.data[np.minimum(A.indptr[:-1],max(A.nnz-1,0))],1.0)
+        A.data = A.data / np.repeat(first,nnz)
+        b = self.__b[rows] / first
+        senses = self.__senses[rows].copy()
+        less,greater = (first < 0) & (senses == '<'),(first < 0) & (senses == '>')
+        senses[less],senses[greater] = '>','<'
+        rng = np.random.default_rng(0)
+        h1 = A @ rng.uniform(1,2,A.shape[1])
+        h2 = A @ rng.uniform(1,2,A.shape[1])
+        code = np.searchsorted(['<','=','>'],senses)
+        # rows with equal projections, number of entries and sense form a group, the first row of the group is the reference
+        order = np.lexsort((code,h2,h1,nnz))
+        new_group = np.r_[True,(np.diff(nnz[order]) != 0) | (np.diff(h1[order]) != 0) | (np.diff(h2[order]) != 0) | (np.diff(code[order]) != 0)]
+        group = np.empty(len(rows),dtype=int)
+        group[order] = np.cumsum(new_group) - 1
+        ref_of_group = order[new_group]
+        counts = np.bincount(group)
+        cand = np.flatnonzero(counts[group] > 1)
+        if len(cand) == 0:
+            return
+        # exact check of the candidates against the reference row of their group
+        ref = ref_of_group[group[cand]]
+        n = nnz[cand]
+        offsets = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n,n)
+        pos_cand = np.repeat(A.indptr[cand],n) + offsets
+        pos_ref = np.repeat(A.indptr[ref],n) + offsets
+        mismatch = (A.indices[pos_cand] != A.indices[pos_ref]) | (np.abs(A.data[pos_cand] - A.data[pos_ref]) > self.tol)
+        same = np.bincount(np.repeat(np.arange(len(cand)),n),weights=mismatch,minlength=len(cand)) == 0
+        dup = cand[same]
+        # keep the tightest equation of each group: smallest b for '<', largest b for '>'; all b of '=' must be equal
+        dup_group = group[dup]
+        value = np.where(code[dup] == 2,-b[dup],b[dup])
+        order = np.lexsort((value,dup_group))
+        dup,dup_group = dup[order],dup_group[order]
+        first = np.r_[True,dup_group[1:] != dup_group[:-1]]
+        starts = np.flatnonzero(first)
+        equal = code[dup[starts]] == 1
+        spread = np.maximum.reduceat(b[dup],starts) - np.minimum.reduceat(b[dup],starts)
+        infeasible = equal & (spread > self.tol * np.maximum(1,np.maximum.reduceat(np.abs(b[dup]),starts)))
+        if infeasible.any():
+            raise Exception(f'Presolve: the equation system is infeasible (equation {rows[dup[starts[infeasible][0]]]} contradicts a duplicate equation)')
+        remove = rows[dup[~first]]
+        self.__rows[remove] = False
+        self.report['duplicate_rows'] += len(remove)
+
+    def __build_reduced(self):
+        self.row_map = np.flatnonzero(self.__rows)  # rows of the original system that are kept
+        self.col_map = np.flatnonzero(self.__cols)  # variables of the original system that are kept
+        self.Aeq = self.__A[self.row_map][:,self.col_map].tocoo()
+        self.beq = self.__b[self.row_map]
+        self.senses = self.__senses[self.row_map]
+        self.lb = self.__lb[self.col_map]
+        self.ub = self.__ub[self.col_map]
+        self.vtypes = self.__vtypes[self.col_map].tolist()
+        self.f = self.__f[self.col_map]
+        self.report.update(rows_after=len(self.row_map),cols_after=len(self.col_map),nnz_after=int(self.Aeq.nnz))
+
+    def reduce_vector(self,x):
+        '''Returns the entries of a full vector (e.g. a start solution) for the variables of the reduced system'''
+        return np.asarray(x,dtype=float)[self.col_map]
+
+    def postsolve(self,x_reduced)->np.ndarray:
+        '''Returns the full result vector: results of the reduced system and the values of the removed variables'''
+        x = self.x_fixed.copy()
+        x[self.col_map] = x_reduced
+        return x
@@ -0,0 +1,83 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+class LPProfiler:
+    '''
+    Records the wall time and optionally the peak memory (tracemalloc) of the phases of setting up and optimizing a model.
+    Phases can be nested, their names are joined with '/' (e.g. 'def_eqs/def_equations'). Phases that belong to an LPObject carry its label.
+    Every finished phase is stored as a record {'phase','object','time_s','peak_mb'} in self.records and passed to the hook, if one is given.
+    '''
+    def __init__(self,track_memory:bool=False,hook=None):
+        """
+        Args:
+            track_memory (bool, optional): measure the peak memory of every phase with tracemalloc (slows down the set up considerably). Defaults to False.
+            hook (callable, optional): function that is called with every finished record, e.g. to forward the numbers to a metrics system. Defaults to None.
+        """
+        self.track_memory = track_memory
+        self.hook = hook
+        self.records:list[dict] = []
+        self.__stack = []
+        self.__started_tracing = False
+
+    def reset(self):
+        '''Deletes all records'''
+        self.records = []
+
+    @contextmanager
+    def phase(self,name:str,obj:str=None):
+        '''
+        Context manager that measures one phase. Yields the record, so further values can be added to it before it is finished
+
+        Args:
+            name (str): name of the phase
+            obj (str, optional): label of the LPObject the phase belongs to. Defaults to None.
+        '''
+        record = {'phase':'/'.join([entry['record']['phase'] for entry in self.__stack[-1:]]+[name]),'object':obj,'time_s':None,'peak_mb':None}
+        entry = {'record':record,'peak':0,'start_mem':0}
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.__started_tracing = True
+            current,peak = tracemalloc.get_traced_memory()
+            if self.__stack:
+                self.__stack[-1]['peak'] = max(self.__stack[-1]['peak'],peak)
+            tracemalloc.reset_peak()
+            entry['start_mem'] = current
+        self.__stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['time_s'] = time.perf_counter() - start
+            self.__stack.pop()
+            if self.track_memory and tracemalloc.is_tracing():
+                peak = max(entry['peak'],tracemalloc.get_traced_memory()[1])
+                record['peak_mb'] = (peak - entry['start_mem']) / 1e6
+                if self.__stack:
+                    self.__stack[-1]['peak'] = max(self.__stack[-1]['peak'],peak)
+                    tracemalloc.reset_peak()
+                elif self.__started_tracing:
+                    tracemalloc.stop()
+                    self.__started_tracing = False
+            self.records.append(record)
+            if self.hook is not None:
+                self.hook(record)
+
+    def report(self)->dict:
+        '''
+        Returns the records summed up per phase {'phases':{phase:{'time_s','calls','peak_mb'}}} and per LPObject {'objects':{object:{phase:time_s}}}
+        together with the single records ('records')
+        '''
+        phases = {}
+        objects = {}
+        for record in self.records:
+            summary = phases.setdefault(record['phase'],{'time_s':0.0,'calls':0,'peak_mb':None})
+            summary['time_s'] += record['time_s']
+            summary['calls'] += 1
+            if record['peak_mb'] is not None:
+                summary['peak_mb'] = max(summary['peak_mb'] or 0.0,record['peak_mb'])
+            if record['object'] is not None:
+                times = objects.setdefault(record['object'],{})
+                times[record['phase']] = times.get(record['phase'],0.0) + record['time_s']
+        return {'phases':phases,'objects':objects,'records':list(self.records)}
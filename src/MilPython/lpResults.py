@@ -0,0 +1,168 @@
+import json
+import numpy as np
+from .lpStateVar import LPStateVar,LPStateVar_timedep
+
+class LPResults:
+    '''
+    All results of an optimization in one place, without copying the result vector x.
+    The time dependent part of x is exposed as a (steps, num_vars_timedep) view (one row per time step, one column per variable) for both
+    orderings of the variables (see LPInputdata.ordering); with the variable-major ordering every column is contiguous in memory,
+    the additional variables as a 1d view. Variables are looked up by their label 'object.variable' (see LPMain.var_labels) or by the stateVar itself:
+    results['Battery.E_el'] returns a view of the column of the variable, which is only created when it is accessed.
+    With dump the results can be written to a memory-mapped file and opened again with LPResults.load without reading them into memory.
+    to_parquet, to_feather and to_csv write the time dependent results as one table (one row per time step, one column per variable) in one go.
+    '''
+    def __init__(self,x,index:dict,steps:int,num_vars_timedep:int,info:dict=None,ordering:str='time'):
+        """
+        Args:
+            x (array): result vector of the optimization
+            index (dict): {label:(pos,timedep)} position of every variable in time step zero and whether it is time dependent
+            steps (int): number of time steps
+            num_vars_timedep (int): number of time dependent variables
+            info (dict, optional): {label:{'unit':...,'vtype':...,'comment':...}} metadata of the variables, written to the exported files. Defaults to None.
+            ordering (str, optional): order of the time dependent variables in x, 'time' (time-major) or 'variable' (variable-major). Defaults to 'time'.
+        """
+        self.x = x
+        self.index = index
+        self.steps = steps
+        self.num_vars_timedep = num_vars_timedep
+        self.info = info if info is not None else {}
+        self.ordering = ordering
+        self.var_labels:dict = {}  # {stateVar:label}, set by from_main
+        if ordering == 'variable':
+            self.timedep = x[:steps*num_vars_timedep].reshape(num_vars_timedep,steps).T
+        else:
+            self.timedep = x[:steps*num_vars_timedep].reshape(steps,num_vars_timedep)
+        self.additional = x[steps*num_vars_timedep:]
+
+    @classmethod
+    def from_main(cls,main,x)->'LPResults':
+        '''Creates the results of the model of the LPMain object main for the result vector x'''
+        labels = main.var_labels()
+        index = {label:(var.pos,isinstance(var,LPStateVar_timedep)) for var,label in labels.items()}
+        info = {label:{'unit':var.unit,'vtype':var.vtype,'comment':var.comment} for var,label in labels.items()}
+        results = cls(x,index,main.inputdata.steps,main.inputdata.num_vars_timedep,info,getattr(main.inputdata,'ordering','time'))
+        results.var_labels = labels
+        return results
+
+    def __getitem__(self,key):
+        '''Result of a variable (label or stateVar): view of its time series for time dependent variables, the value for additional variables'''
+        pos,timedep = self.index[self.__label(key)]
+        if timedep:
+            return self.timedep[:,self.column(pos)]
+        return self.x[pos]
+
+    def column(self,pos:int)->int:
+        '''Column of self.timedep of the time dependent variable with the position pos'''
+        return pos // self.steps if self.ordering == 'variable' else pos
+
+    def __contains__(self,key):
+        return (self.var_labels.get(key) if isinstance(key,LPStateVar) else key) in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def items(self):
+        for label in self.index:
+            yield label,self[label]
+
+    def labels(self,timedep:bool=None)->list:
+        '''Returns the labels of all variables; timedep=True/False only returns the time dependent/additional variables'''
+        return [label for label,(_,td) in self.index.items() if timedep is None or td == timedep]
+
+    def __label(self,key):
+        if isinstance(key,LPStateVar):
+            if key not in self.var_labels:
+                raise KeyError(f'{key} is not part of the results')
+            return self.var_labels[key]
+        if key not in self.index:
+            raise KeyError(f"No variable with the label '{key}'. Labels have the format 'object.variable', e.g. '{next(iter(self.index),'Battery.E_el')}'")
+        return key
+
+    def dump(self,path:str)->'LPResults':
+        '''
+        Writes the result vector to the memory-mapped .npy file path and the labels to path + '.json'.
+        Returns the results backed by the memory-mapped file
+        '''
+        x = np.lib.format.open_memmap(path,mode='w+',dtype=float,shape=(len(self.x),))
+        x[:] = self.x
+        x.flush()
+        meta = {'steps':self.steps,'num_vars_timedep':self.num_vars_timedep,'info':self.info,'ordering':self.ordering,
+                'index':{label:[int(pos),bool(timedep)] for label,(pos,timedep) in self.index.items()}}
+        with open(path+'.json','w') as file:
+            json.dump(meta,file)
+        results = LPResults(x,self.index,self.steps,self.num_vars_timedep,self.info,self.ordering)
+        results.var_labels = self.var_labels
+        return results
+
+    @classmethod
+    def load(cls,path:str,mmap_mode:str='r')->'LPResults':
+        '''Opens results written with dump; the result vector is memory-mapped (mmap_mode as in np.load, None reads it into memory)'''
+        with open(path+'.json') as file:
+            meta = json.load(file)
+        x = np.load(path,mmap_mode=mmap_mode)
+        index = {label:(pos,timedep) for label,(pos,timedep) in meta['index'].items()}
+        return cls(x,index,meta['steps'],meta['num_vars_timedep'],meta['info'],meta.get('ordering','time'))
+
+    def additional_values(self)->dict:
+        '''Returns {label:value} of all additional variables'''
+        return {label:float(self.x[pos]) for label,(pos,timedep) in self.index.items() if not timedep}
+
+    def __timedep_labels(self):
+        '''Labels of the time dependent variables in the order of the columns of self.timedep'''
+        labels = [None]*self.num_vars_timedep
+        for label,(pos,timedep) in self.index.items():
+            if timedep:
+                labels[self.column(pos)] = label
+        return labels
+
+    def __metadata(self)->dict:
+        '''Metadata of the exported tables: steps, variable info and the values of the additional variables'''
+        return {'steps':self.steps,'info':self.info,'additional':self.additional_values()}
+
+    def to_frame(self):
+        '''Returns the time dependent results as pandas DataFrame (one row per time step, one column per variable)'''
+        import pandas as pd
+        df = pd.DataFrame(self.timedep,columns=self.__timedep_labels())
+        df.index.name = 't'
+        return df
+
+    def to_table(self):
+        '''
+        Returns the time dependent results as pyarrow Table with a column 't' and one column per variable.
+        Unit, variable type and comment are stored as metadata of the fields, steps, variable info and additional variables as metadata of the schema (key 'milpython')
+        '''
+        import pyarrow as pa
+        columns = np.ascontiguousarray(self.timedep.T)
+        fields = [pa.field('t',pa.int64())]
+        for label in self.__timedep_labels():
+            info = self.info.get(label,{})
+            fields.append(pa.field(label,pa.float64(),metadata={key:str(value) for key,value in info.items() if value is not None}))
+        schema = pa.schema(fields,metadata={'milpython':json.dumps(self.__metadata())})
+        return pa.Table.from_arrays([pa.array(np.arange(self.steps))]+[pa.array(column) for column in columns],schema=schema)
+
+    def to_parquet(self,path:str,compression:str='zstd'):
+        '''Writes the time dependent results with metadata (see to_table) to a Parquet file'''
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_table(),path,compression=compression)
+
+    def to_feather(self,path:str,compression:str='zstd'):
+        '''Writes the time dependent results with metadata (see to_table) to a Feather (Arrow IPC) file'''
+        import pyarrow.feather as feather
+        feather.write_feather(self.to_table(),path,compression=compression)
+
+    def to_csv(self,path:str):
+        '''Writes the time dependent results to a CSV file; CSV has no metadata, so steps, variable info and additional variables are written to path + '.json' '''
+        import pyarrow.csv as csv
+        csv.write_csv(self.to_table(),path)
+        with open(path+'.json','w') as file:
+            json.dump(self.__metadata(),file)
+
+    def __repr__(self):
+        return f'LPResults({len(self.index)} variables, {self.steps} steps)'
@@ -1,12 +1,13 @@
-import matplotlib.pyplot as plt
-
 class LPStateVar:
     '''
     Abstract class (only create objects of the inheriting classes)
     Defines state variables for linear optimization
     Contains name, unit, lower and upper bound and space for comments
     when optimizing, the optimized results for the variable are stored under self.result
+    The attributes are stored in __slots__; own attributes can still be added to a variable (their __dict__ is only created then)
     '''
+    __slots__ = ('pos','name','lb','ub','vtype','unit','result','comment','__dict__')
+
     def __init__(self,name:str,unit:str=None,lb:float=0,ub:float=float('inf'),vtype='C',comment:str=None):
         """Init-Method for abstract LPStateVar-class. Has to be run by inheriting classes init-fun
 
@@ -39,7 +40,12 @@ class LPStateVar_timedep(LPStateVar):
     Class for time-dependent state variables
     A variable of this type is automatically created for each time step
     self.pos corresponds to the position of the variable in time step zero.
+    lb and ub can be single values or arrays with one value per time step
+    self.initial is the value of the variable before the first time step (e.g. the state of charge of a storage). It is used by equation blocks with boundary='fixed'
+    and is updated by LPMain.optimize_rolling from window to window
     '''
+    __slots__ = ('initial',)
+
     def __init__(self, name, unit=None,  lb=0, ub=float('inf'),vtype='C', comment=None):
         """
         Args:
@@ -50,12 +56,14 @@ class LPStateVar_timedep(LPStateVar):
             comment (str, optional): optional space for comment, store sign convention here. Defaults to ''.
         """        
         super().__init__(name, unit, lb, ub, vtype, comment)
+        self.initial:float=None
     
     def plot_result(self):
         '''Simple method for plotting the time histories of the optimization result for this variable'''
         if self.result is None:
             print('The optimization must be performed first')
             return
+        import matplotlib.pyplot as plt
         plt.plot(self.result)
         plt.title(self.name)
         plt.ylabel(self.unit)
@@ -69,6 +77,8 @@ class LPStateVar_timedep(LPStateVar):
 
 class LPStateVar_add(LPStateVar):
     '''Class for additional variables that only occur once (and not in every time step) '''
+    __slots__ = ()
+
     def __init__(self, name, unit=None, lb=0, ub=float('inf'),vtype='C', comment=None):
         """
         Args:
@@ -1,11 +1,11 @@
 from enum import Enum
-import matplotlib.pyplot as plt
 from .lpStateVar import LPStateVar
 
 class Solver(Enum):
     GUROBI=0
     SCIPY=1
     CPLEX=2
+    HIGHS=3
 
 class Obj(Enum):
     MINIMIZE=0
@@ -16,6 +16,7 @@ def plot_sum(var1:LPStateVar,var2:LPStateVar,name=''):
     if var1.result is None or var2.result is None:
         print('The optimization must be performed first')
         return
+    import matplotlib.pyplot as plt
     summe = var1.result - var2.result
     plt.plot(summe)
     plt.title(name)